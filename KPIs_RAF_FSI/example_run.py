@@ -1,3 +1,10 @@
+import os
+import sys
+
+# Run as a script (python KPIs_RAF_FSI/example_run.py): import the top-level modules
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
 from kpi_fetch_doc_items import fetch_bs_items, fetch_pl_items ,fetch_cf_items
 from get_kpi_on_doc_type import balance_sheet_kpis, profit_and_loss_kpis, cashflow_kpis, cross_statement_kpis
 
@@ -38,7 +45,7 @@ for company in companies:
     cf_kpis = cashflow_kpis(cf_df)
     check_missing(cf_kpis, f"{company} Cashflow KPIs")
 
-    x_kpis = cross_statement_kpis(company)
+    x_kpis = cross_statement_kpis(bs_df, pl_df, cf_df)
     check_missing(x_kpis, f"{company} Cross Statement KPIs")
 
 print("\n======= SUMMARY =======")
@@ -1,67 +1,171 @@
-import re
+import asyncio
+import contextvars
+import functools
 import os
-from dotenv import load_dotenv
-from langchain_community.vectorstores import FAISS
-from langchain_openai import OpenAIEmbeddings
+from concurrent.futures import ThreadPoolExecutor
+import faiss
+import numpy as np
+from vector_store import get_vectorstore
+from fiscal_years import year_fields
+from line_item_store import get_line_item_store, parse_chunk_years
+from metrics import span, timed
 
+# Bounded pool for blocking FAISS/docstore work behind the async lookups
+_search_pool = ThreadPoolExecutor(
+    max_workers=int(os.getenv("FAISS_SEARCH_WORKERS", "4")),
+    thread_name_prefix="faiss-search",
+)
 
-def _parse_fys(text: str):
-    """Extract FY2024 and FY2023 numbers from a chunk string."""
-    # Matches: FY2024: 12345.67 or FY2023: -1,234
-    fy24 = re.search(r"FY\s*2024\s*:\s*(-?\d[\d,]*\.?\d*)", text, re.I)
-    fy23 = re.search(r"FY\s*2023\s*:\s*(-?\d[\d,]*\.?\d*)", text, re.I)
-    to_float = lambda m: float(m.group(1).replace(",", "")) if m else None
-    return to_float(fy24), to_float(fy23)
 
-
-def rag_lookup(company: str, statement_type: str, query: str, k: int = 3):
-    """
-    Vector search for a given canonical query (line_item) and parse FY values.
-    Returns: {"line_item": <canonical>, "fy_2024": <num>, "fy_2023": <num>} or None
-    """
-    load_dotenv(dotenv_path="../.env")
-    openai_key = os.getenv("OPENAI_API_KEY")
-    embeddings = OpenAIEmbeddings(openai_api_key=openai_key)
-
-    vectorstore = FAISS.load_local(
-        ".",
-        embeddings,
-        allow_dangerous_deserialization=True,
-    )
-
-    search = f"{company} {statement_type} {query}"
-    results = vectorstore.similarity_search(search, k=k)
-
-    if not results:
-        return None
-
-    # Take first hit and parse
-    for doc in results:
-        parts = [p.strip() for p in doc.page_content.split("|")]
-        if len(parts) < 4:
+def _parse_hit(docs, query: str):
+    """Take the first well-formed chunk among `docs` and parse its FY values."""
+    for doc in docs:
+        parsed = parse_chunk_years(doc.page_content)
+        if parsed is None:
             continue
 
-        line_item = parts[2]  # "Total current assets"
-        values = parts[3]     # "FY24 = 89432.0, FY23 = 70881.0"
-
-        # parse numbers safely
-        fy24 = None
-        fy23 = None
-        try:
-            for seg in values.split(","):
-                seg = seg.strip()
-                if seg.startswith("FY24"):
-                    fy24 = float(seg.split("=")[1].strip())
-                elif seg.startswith("FY23"):
-                    fy23 = float(seg.split("=")[1].strip())
-        except Exception:
-            pass
-
+        _, _, line_item, years = parsed
         return {
             "line_item": query,           # canonical for downstream KPIs
             "matched_line_item": line_item,  # actual chunk text (optional, for debugging)
-            "fy_2024": fy24,
-            "fy_2023": fy23,
+            **year_fields(years),         # fy_2024, fy_2023, ... one key per year in the chunk
         }
 
     return None
+
+
+def _docs_for(vectorstore, indices):
+    return [
+        [vectorstore.docstore.search(vectorstore.index_to_docstore_id[i]) for i in row if i != -1]
+        for row in indices
+    ]
+
+
+def _search_partitioned(vectorstore, store, partition, vectors, k: int):
+    """
+    One FAISS matrix search for several query vectors, restricted to one
+    (company, statement_type) partition of the index; returns docs per row.
+    An unknown partition finds nothing: searching the whole index would
+    return another company's figures.
+    """
+    vectors = np.array(vectors, dtype=np.float32)
+    if vectorstore._normalize_L2:
+        faiss.normalize_L2(vectors)
+    with span("faiss_search"):
+        indices = store.search_partition(*partition, vectors, k)
+    if indices is None:
+        return [[] for _ in vectors]
+    with span("docstore"):
+        return _docs_for(vectorstore, indices)
+
+
+def _plan_misses(lookups, misses):
+    """Search string per miss, and the distinct strings grouped by partition."""
+    searches = {i: "{} {} {}".format(*lookups[i]) for i in misses}
+    by_partition = {}
+    for i in misses:
+        texts = by_partition.setdefault(lookups[i][:2], [])
+        if searches[i] not in texts:
+            texts.append(searches[i])
+    return searches, by_partition
+
+
+def _in_pool(loop, fn, *args):
+    """run_in_executor on the search pool, carrying contextvars (timing spans) along."""
+    ctx = contextvars.copy_context()
+    return loop.run_in_executor(_search_pool, functools.partial(ctx.run, fn, *args))
+
+
+@timed("rag_lookup")
+def rag_lookup_batch(lookups, k: int = 3):
+    """
+    Batched rag_lookup over (company, statement_type, query) triples.
+    Exact (company, statement, line item) matches are answered from the
+    structured line-item store; only the misses are embedded, in a single
+    embed_documents call, and searched one matrix query per company/statement
+    partition, so a hit can never come from another company's chunks.
+    Returns one rag_lookup result per triple.
+    """
+    if not lookups:
+        return []
+    store = get_line_item_store()
+    with span("structured_lookup"):
+        results = [store.lookup(*lookup) for lookup in lookups]
+    # Companies/statements with no chunks stay misses, without an embedding call
+    misses = [i for i, hit in enumerate(results) if hit is None and store.has_partition(*lookups[i][:2])]
+    if not misses:
+        return results
+
+    vectorstore = get_vectorstore()
+    searches, by_partition = _plan_misses(lookups, misses)
+    unique = list(dict.fromkeys(searches.values()))
+    with span("embedding"):
+        vectors = dict(zip(unique, vectorstore.embeddings.embed_documents(unique)))
+
+    docs_by_search = {}
+    for partition, texts in by_partition.items():
+        docs = _search_partitioned(vectorstore, store, partition, [vectors[t] for t in texts], k)
+        docs_by_search.update(zip(texts, docs))
+
+    with span("chunk_parse"):
+        for i in misses:
+            results[i] = _parse_hit(docs_by_search[searches[i]], lookups[i][2])
+    return results
+
+
+@timed("rag_lookup")
+async def arag_lookup_batch(lookups, k: int = 3):
+    """
+    Async rag_lookup_batch: the embedding call is awaited on the event loop
+    and the blocking FAISS work runs on a bounded thread pool, one task per
+    partition, so concurrent requests don't stall a worker.
+    """
+    if not lookups:
+        return []
+    loop = asyncio.get_running_loop()
+    # First call may load the index from disk; keep that off the loop too
+    store = await _in_pool(loop, get_line_item_store)
+    with span("structured_lookup"):
+        results = [store.lookup(*lookup) for lookup in lookups]
+    # Companies/statements with no chunks stay misses, without an embedding call
+    misses = [i for i, hit in enumerate(results) if hit is None and store.has_partition(*lookups[i][:2])]
+    if not misses:
+        return results
+
+    vectorstore = get_vectorstore()
+    searches, by_partition = _plan_misses(lookups, misses)
+    unique = list(dict.fromkeys(searches.values()))
+    with span("embedding"):
+        vectors = dict(zip(unique, await vectorstore.embeddings.aembed_documents(unique)))
+
+    partitions = list(by_partition.items())
+    found = await asyncio.gather(*[
+        _in_pool(
+            loop, _search_partitioned,
+            vectorstore, store, partition, [vectors[t] for t in texts], k,
+        )
+        for partition, texts in partitions
+    ])
+    docs_by_search = {}
+    for (_, texts), docs in zip(partitions, found):
+        docs_by_search.update(zip(texts, docs))
+
+    with span("chunk_parse"):
+        for i in misses:
+            results[i] = _parse_hit(docs_by_search[searches[i]], lookups[i][2])
+    return results
+
+
+def rag_lookup_many(company: str, statement_type: str, queries, k: int = 3):
+    """rag_lookup for every query of one statement, in one embedding round trip."""
+    return rag_lookup_batch([(company, statement_type, q) for q in queries], k=k)
+
+
+def rag_lookup(company: str, statement_type: str, query: str, k: int = 3):
+    """
+    Exact line-item lookup for a canonical query, falling back to vector
+    search and parsing FY values from the best chunk.
+    Returns: {"line_item": <canonical>, "fy_2024": <num>, "fy_2023": <num>, ...} or None,
+    with an fy_YYYY key for every year the chunk has
+    """
+    return rag_lookup_batch([(company, statement_type, query)], k=k)[0]
@@ -0,0 +1,163 @@
+"""
+Index type comparison: python -m benchmarks.ann [--companies 1000 --dim 1536 | --index-dir DIR]
+
+Builds each index option over the same vectors, then loads it in a fresh
+process exactly as the server does (mmap'd, index_types.configure) and
+reports recall@k against exact flat search, single-query p50/p99 latency,
+resident memory after load + queries, file size and build time.
+Options are index types from index_types.INDEX_TYPES, optionally with a
+PCA projection: e.g. --options flat,hnsw,ivf_pq,ivf_pq/pca256
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import faiss
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+import index_types
+
+DEFAULT_OPTIONS = "flat,ivf_flat,hnsw,ivf_pq,hnsw/pca256,ivf_pq/pca256"
+
+
+def rss_mb() -> float:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return float("nan")
+
+
+def worker(index_path: str, queries_path: str, truth_path: str, k: int):
+    """Runs in a child process so memory numbers belong to one index only."""
+    queries = np.load(queries_path)
+    truth = np.load(truth_path)
+    before = rss_mb()
+    index = faiss.read_index(index_path, faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY)
+    index_types.configure(index)
+
+    latencies, found = [], []
+    for q in queries:
+        t0 = time.perf_counter()
+        _, ids = index.search(q[None, :], k)
+        latencies.append(time.perf_counter() - t0)
+        found.append(ids[0])
+    recall = np.mean([len(set(f) & set(t)) / k for f, t in zip(found, truth)])
+    ms = np.array(latencies) * 1000
+    print(json.dumps({
+        "recall": round(float(recall), 4),
+        "p50_ms": round(float(np.percentile(ms, 50)), 4),
+        "p99_ms": round(float(np.percentile(ms, 99)), 4),
+        "rss_mb": round(rss_mb() - before, 1),
+    }))
+
+
+def synthetic_data(companies: int, dim: int, n_queries: int, seed: int):
+    """Vectors of a synthetic index plus embedded lookup-style queries (some paraphrased)."""
+    from benchmarks.synthetic import ALIASES, STATEMENTS, build_vectorstore, company_name
+
+    store, _ = build_vectorstore(companies, dim=dim, seed=seed)
+    vectors = store.index.reconstruct_n(0, store.index.ntotal)
+    rng = np.random.default_rng(seed)
+    texts = []
+    for _ in range(n_queries):
+        statement_type = rng.choice(list(STATEMENTS))
+        item = rng.choice(STATEMENTS[statement_type])
+        if item in ALIASES and rng.random() < 0.5:
+            item = ALIASES[item]
+        texts.append(f"{company_name(int(rng.integers(companies)))} {statement_type} {item}")
+    queries = np.array(store.embeddings.embed_documents(texts), dtype=np.float32)
+    return vectors, queries
+
+
+def index_dir_data(index_dir: str, n_queries: int, seed: int):
+    """Vectors of an existing index; queries are stored vectors plus noise (no embeddings offline)."""
+    index = faiss.read_index(os.path.join(index_dir, "index.faiss"))
+    vectors = index.reconstruct_n(0, index.ntotal)
+    rng = np.random.default_rng(seed)
+    picks = vectors[rng.integers(len(vectors), size=n_queries)]
+    scale = float(np.linalg.norm(vectors, axis=1).mean()) * 0.05
+    return vectors, (picks + rng.normal(0, scale / np.sqrt(vectors.shape[1]), picks.shape)).astype(np.float32)
+
+
+def parse_option(option: str):
+    """'ivf_pq/pca256' -> ('ivf_pq', 256)."""
+    index_type, _, pca = option.partition("/")
+    return index_type, int(pca[3:]) if pca else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--companies", type=int, default=1000, help="synthetic index size")
+    parser.add_argument("--dim", type=int, default=1536, help="synthetic vector dimension")
+    parser.add_argument("--index-dir", help="benchmark an existing index.faiss instead")
+    parser.add_argument("--options", default=DEFAULT_OPTIONS)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="also write the results to this file")
+    parser.add_argument("--worker", nargs=3, metavar=("INDEX", "QUERIES", "TRUTH"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(*args.worker, args.k)
+        return
+
+    if args.index_dir:
+        vectors, queries = index_dir_data(args.index_dir, args.queries, args.seed)
+    else:
+        print(f"🏗️  Building synthetic vectors for {args.companies} companies at {args.dim} dims...")
+        vectors, queries = synthetic_data(args.companies, args.dim, args.queries, args.seed)
+    print(f"   {len(vectors)} vectors x {vectors.shape[1]} dims, {len(queries)} queries, k={args.k}")
+
+    exact = faiss.IndexFlatL2(vectors.shape[1])
+    exact.add(vectors)
+    _, truth = exact.search(queries, args.k)
+    del exact
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        np.save(os.path.join(tmp, "queries.npy"), queries)
+        np.save(os.path.join(tmp, "truth.npy"), truth)
+        for option in args.options.split(","):
+            index_type, pca_dim = parse_option(option)
+            t0 = time.perf_counter()
+            index = index_types.build(vectors, index_type, pca_dim)
+            built = time.perf_counter() - t0
+            path = os.path.join(tmp, f"{option.replace('/', '_')}.faiss")
+            faiss.write_index(index, path)
+            del index
+
+            proc = subprocess.run(
+                [sys.executable, "-m", "benchmarks.ann", "--k", str(args.k), "--worker", path,
+                 os.path.join(tmp, "queries.npy"), os.path.join(tmp, "truth.npy")],
+                cwd=BASE_DIR, capture_output=True, text=True,
+            )
+            if proc.returncode != 0:
+                print(f"❌ {option}: {proc.stderr.strip().splitlines()[-1]}")
+                continue
+            result = json.loads(proc.stdout.strip().splitlines()[-1])
+            result.update({
+                "spec": index_types.factory_spec(index_type, vectors.shape[1], len(vectors), pca_dim),
+                "build_s": round(built, 2),
+                "file_mb": round(os.path.getsize(path) / 2**20, 1),
+            })
+            results[option] = result
+            print(f"  {option:16s} recall@{args.k} {result['recall']:.3f}   p50 {result['p50_ms']:8.3f} ms   "
+                  f"p99 {result['p99_ms']:8.3f} ms   rss {result['rss_mb']:8.1f} MB   "
+                  f"file {result['file_mb']:8.1f} MB   build {result['build_s']:6.1f}s   ({result['spec']})")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"vectors": len(vectors), "dim": int(vectors.shape[1]), "k": args.k, "results": results}, f, indent=2)
+        print(f"💾 Saved {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+import re
+import zlib
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.fake import FakeListLLM
+
+DEFAULT_DIM = 64
+
+_TOKEN = re.compile(r"[a-z][a-z0-9&]*")
+
+
+class HashEmbeddings(Embeddings):
+    """
+    Deterministic, network-free stand-in for OpenAIEmbeddings.
+    A text embeds to the normalised sum of per-token random vectors, seeded
+    by crc32 of the token, so texts sharing words land close together.
+    Pure numbers are ignored, so a chunk and a query about the same line
+    item match regardless of the figures in the chunk.
+    """
+
+    model = "hash-embeddings"
+
+    def __init__(self, dim: int = DEFAULT_DIM):
+        self.dim = dim
+        self.calls = 0
+        self._tokens = {}
+
+    def token_vector(self, token: str):
+        vec = self._tokens.get(token)
+        if vec is None:
+            rng = np.random.default_rng(zlib.crc32(token.encode()))
+            vec = self._tokens[token] = rng.standard_normal(self.dim).astype(np.float32)
+        return vec
+
+    def raw(self, text: str):
+        """Unnormalised token sum; sums of parts equal the embedding of the joined text."""
+        vec = np.zeros(self.dim, dtype=np.float32)
+        for token in _TOKEN.findall(text.lower()):
+            vec += self.token_vector(token)
+        return vec
+
+    def embed_documents(self, texts):
+        self.calls += 1
+        out = []
+        for text in texts:
+            vec = self.raw(text)
+            norm = np.linalg.norm(vec)
+            out.append((vec / norm if norm else vec).tolist())
+        return out
+
+    def embed_query(self, text: str):
+        return self.embed_documents([text])[0]
+
+
+def fake_llm(answer: str = "Synthetic answer.") -> FakeListLLM:
+    """Stand-in for ChatOpenAI: returns the same canned answer to every prompt."""
+    return FakeListLLM(responses=[answer])
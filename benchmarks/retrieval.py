@@ -0,0 +1,94 @@
+"""
+askQuestion retrieval comparison: python -m benchmarks.retrieval [--companies 1000] [--budgets 5:10,5:20]
+
+Builds a synthetic index and asks lookup-style questions about one line
+item of one company (a third of them phrased with a different line-item
+wording than the chunk). For the MMR retriever rag_query used before and
+for HybridRetriever at each k:fetch_k budget, it reports:
+  hit rate   share of questions whose chunk is among the docs the LLM sees
+  on-company share of those docs about the asked company
+  candidates chunks scored before re-ranking / fusion
+  context    mean characters of context sent to the LLM
+  p50        retrieval latency (embedding + search), ms
+"""
+import argparse
+import os
+import sys
+import time
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from hybrid_retriever import HybridRetriever
+from benchmarks.fakes import DEFAULT_DIM
+from benchmarks.synthetic import ALIASES, STATEMENTS, build_vectorstore, company_name
+
+QUESTIONS = [
+    "What is the {item} of {company}?",
+    "{company} {item} FY24",
+    "Give me {item} for {company}",
+]
+
+
+def questions(n_companies: int, n: int, seed: int):
+    """[(question, company, item as stored for that company or its alias)]"""
+    rng = np.random.default_rng(seed)
+    cases = []
+    for _ in range(n):
+        company = company_name(int(rng.integers(n_companies)))
+        statement_type = rng.choice(list(STATEMENTS))
+        item = str(rng.choice(STATEMENTS[statement_type]))
+        asked = ALIASES[item] if item in ALIASES and rng.random() < 0.5 else item
+        template = QUESTIONS[int(rng.integers(len(QUESTIONS)))]
+        cases.append((template.format(item=asked, company=company), company, {item, ALIASES.get(item, item)}))
+    return cases
+
+
+def evaluate(retriever, cases) -> dict:
+    hits, on_company, context, latencies = 0, [], [], []
+    for question, company, items in cases:
+        t0 = time.perf_counter()
+        docs = retriever.invoke(question)
+        latencies.append(time.perf_counter() - t0)
+        parts = [d.page_content.split(" | ") for d in docs]
+        hits += any(p[0] == company and p[2] in items for p in parts)
+        on_company.append(np.mean([p[0] == company for p in parts]) if parts else 0.0)
+        context.append(sum(len(d.page_content) for d in docs))
+    return {
+        "hit_rate": hits / len(cases),
+        "on_company": float(np.mean(on_company)),
+        "context_chars": float(np.mean(context)),
+        "p50_ms": float(np.percentile(np.array(latencies) * 1000, 50)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--companies", type=int, default=1000)
+    parser.add_argument("--dim", type=int, default=DEFAULT_DIM)
+    parser.add_argument("--questions", type=int, default=300)
+    parser.add_argument("--budgets", default="5:10,5:20,10:20", help="comma-separated k:fetch_k for the hybrid retriever")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"🏗️  Building synthetic index for {args.companies} companies...")
+    store, _ = build_vectorstore(args.companies, dim=args.dim, seed=args.seed)
+    cases = questions(args.companies, args.questions, args.seed)
+    t0 = time.perf_counter()
+    hybrid = HybridRetriever.from_vectorstore(store)
+    print(f"   {store.index.ntotal} chunks, BM25 index built in {time.perf_counter() - t0:.2f}s")
+
+    runs = [("mmr k=10 fetch_k=50", store.as_retriever(search_type="mmr", search_kwargs={"k": 10, "fetch_k": 50}), 50)]
+    for budget in args.budgets.split(","):
+        k, fetch_k = (int(x) for x in budget.split(":"))
+        runs.append((f"hybrid k={k} fetch_k={fetch_k}", hybrid.model_copy(update={"k": k, "fetch_k": fetch_k}), 2 * fetch_k))
+
+    for name, retriever, candidates in runs:
+        r = evaluate(retriever, cases)
+        print(f"  {name:26s} hit rate {r['hit_rate']:6.1%}   on-company {r['on_company']:6.1%}   "
+              f"candidates {candidates:4d}   context {r['context_chars']:7.0f} chars   p50 {r['p50_ms']:7.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
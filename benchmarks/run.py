@@ -0,0 +1,265 @@
+"""
+Offline benchmarks: python -m benchmarks.run [--sizes 10,1000] [--save | --save-new | --compare]
+
+Builds a synthetic FAISS index per size (number of companies), swaps in
+local fake embeddings and a fake LLM (no network, no OPENAI_API_KEY), then
+times rag_lookup, _fetch_required, each KPI function, the companyMetrics
+resolver and askQuestion (RAG + LLM path and direct-answer fast path).
+--save writes benchmarks/baselines/<n>_companies.json; --compare exits non-zero if any p50 is more than --tolerance slower than it.
+--save-new only adds benchmarks the baseline doesn't have yet, leaving existing entries as they were.
+The 100000 tier is supported but needs several GB of RAM.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import sys
+import time
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+import direct_answer
+import graphql_server
+import rag_query
+import result_cache
+import vector_store
+import get_kpi_on_doc_type as kpis
+from kpi_fetch_doc_items import BS_ITEMS, CF_ITEMS, PL_ITEMS, _fetch_required, fetch_all_items, fetch_kpis
+from KPIs_RAF_FSI.kpi_rag_retrieval import rag_lookup
+from line_item_store import get_line_item_store
+from benchmarks.fakes import DEFAULT_DIM, fake_llm
+from benchmarks.synthetic import STATEMENTS, build_vectorstore
+
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines")
+
+MIN_ITERATIONS = 5
+MAX_ITERATIONS = 2000
+SAMPLE_COMPANIES = 200  # distinct companies cycled through per benchmark
+
+METRICS_QUERY = """
+query ($company: String!) {
+  companyMetrics(company: $company) {
+    balanceSheet { name value }
+    pnl { name value }
+    cashflow { name value }
+    crossStatement { name value }
+    coverage { total missingCount }
+  }
+}
+"""
+
+BALANCE_SHEET_QUERY = """
+query ($company: String!) {
+  companyMetrics(company: $company) { balanceSheet { name value } }
+}
+"""
+
+
+def measure(call, cases, min_time: float, warmup: int = 3) -> dict:
+    """Time call(case) over the cycled cases for at least min_time seconds."""
+    for case in cases[:warmup]:
+        call(case)
+    timings = []
+    started = time.perf_counter()
+    while len(timings) < MAX_ITERATIONS and (
+        len(timings) < MIN_ITERATIONS or time.perf_counter() - started < min_time
+    ):
+        case = cases[len(timings) % len(cases)]
+        t0 = time.perf_counter()
+        call(case)
+        timings.append(time.perf_counter() - t0)
+    ms = np.array(timings) * 1000
+    return {
+        "iterations": len(timings),
+        "mean_ms": round(float(ms.mean()), 4),
+        "p50_ms": round(float(np.percentile(ms, 50)), 4),
+        "p95_ms": round(float(np.percentile(ms, 95)), 4),
+        "p99_ms": round(float(np.percentile(ms, 99)), 4),
+        "ops_per_s": round(len(timings) / (ms.sum() / 1000), 2),
+    }
+
+
+def all_sections(statements):
+    bs, pl, cf = statements
+    kpis.balance_sheet_kpis(bs)
+    kpis.profit_and_loss_kpis(pl)
+    kpis.cashflow_kpis(cf)
+    kpis.cross_statement_kpis(bs, pl, cf)
+
+
+def setup_tier(n_companies: int, dim: int, seed: int):
+    """Build the synthetic index and install it, the fakes and a cold cache."""
+    t0 = time.perf_counter()
+    store, companies = build_vectorstore(n_companies, dim=dim, seed=seed)
+    built = time.perf_counter() - t0
+
+    vector_store.set_vectorstore(store, version=f"synthetic-{n_companies}-{seed}")
+    rag_query.llm = fake_llm()
+    t0 = time.perf_counter()
+    get_line_item_store()
+    loaded = time.perf_counter() - t0
+    return companies, {"chunks": store.index.ntotal, "build_s": round(built, 2), "line_item_store_s": round(loaded, 2)}
+
+
+def run_tier(companies, min_time: float, seed: int) -> dict:
+    rng = np.random.default_rng(seed)
+    sample = list(rng.choice(companies, size=min(SAMPLE_COMPANIES, len(companies)), replace=False))
+    results = {}
+
+    # Canonical names: mostly structured-store hits
+    lookups = [(c, st, item) for c in sample for st, items in STATEMENTS.items() for item in items[:3]]
+    results["rag_lookup"] = measure(lambda case: rag_lookup(*case), lookups, min_time)
+    # Paraphrases never stored verbatim: always embedding + partitioned FAISS search
+    paraphrased = [(c, "balance_sheet", "current assets in total") for c in sample]
+    results["rag_lookup_vector"] = measure(lambda case: rag_lookup(*case), paraphrased, min_time)
+
+    for statement_type, items in [("balance_sheet", BS_ITEMS), ("profit_and_loss", PL_ITEMS), ("cash_flows", CF_ITEMS)]:
+        results[f"fetch_required.{statement_type}"] = measure(
+            lambda c: _fetch_required(c, statement_type, items), sample, min_time,
+        )
+
+    frames = [fetch_all_items(c) for c in sample[:20]]
+    results["kpi.balance_sheet"] = measure(lambda f: kpis.balance_sheet_kpis(f[0]), frames, min_time)
+    results["kpi.pnl"] = measure(lambda f: kpis.profit_and_loss_kpis(f[1]), frames, min_time)
+    results["kpi.cashflow"] = measure(lambda f: kpis.cashflow_kpis(f[2]), frames, min_time)
+    results["kpi.cross_statement"] = measure(lambda f: kpis.cross_statement_kpis(*f), frames, min_time)
+    # Per-company KPI CPU over LineItemTables vs the DataFrames fetchers used to return
+    results["kpi.all_sections"] = measure(all_sections, frames, min_time)
+    pandas_frames = [tuple(t.to_pandas() for t in f) for f in frames]
+    results["kpi.all_sections_pandas"] = measure(all_sections, pandas_frames, min_time)
+    # Registry plans: one ratio fetches 2 line items, every KPI each item once
+    results["fetch_kpis.current_ratio"] = measure(
+        lambda c: fetch_kpis(c, kpis=["current_ratio_2024"]), sample, min_time,
+    )
+    results["fetch_kpis.all"] = measure(lambda c: fetch_kpis(c), sample, min_time)
+
+    loop = asyncio.new_event_loop()
+
+    def company_metrics(company, query=METRICS_QUERY):
+        async def execute():
+            context = await graphql_server.get_context()
+            return await graphql_server.schema.execute(
+                query, variable_values={"company": company}, context_value=context,
+            )
+        result = loop.run_until_complete(execute())
+        assert not result.errors, result.errors
+
+    # No-op cache for the cold path, a real one for the warm path
+    result_cache.set_metrics_cache(result_cache.TTLCache(max_entries=0))
+    results["company_metrics"] = measure(company_metrics, sample, min_time)
+    # Sections are resolved lazily: one section is a third of the lookups
+    results["company_metrics_balance_sheet"] = measure(
+        lambda c: company_metrics(c, BALANCE_SHEET_QUERY), sample, min_time,
+    )
+    result_cache.set_metrics_cache(result_cache.TTLCache())
+    results["company_metrics_cached"] = measure(company_metrics, sample[:5], min_time, warmup=5)
+    loop.close()
+
+    def ask(company):
+        rag_query.answer_cache.clear()  # time the retrieval + LLM path, not the answer cache
+        rag_query.run_rag_question(f"What is the Total Equity of {company}?")
+
+    # The same lookup question with the direct-answer fast path off, then on
+    threshold = direct_answer.DIRECT_ANSWER_THRESHOLD
+    direct_answer.DIRECT_ANSWER_THRESHOLD = 2.0
+    results["ask_question"] = measure(ask, sample, min_time)
+    direct_answer.DIRECT_ANSWER_THRESHOLD = threshold
+    results["ask_question_direct"] = measure(ask, sample, min_time)
+    return results
+
+
+def baseline_path(n_companies: int) -> str:
+    return os.path.join(BASELINE_DIR, f"{n_companies}_companies.json")
+
+
+def save_new(n_companies: int, report: dict) -> list:
+    """Add the report's benchmarks that the baseline lacks; returns their names."""
+    path = baseline_path(n_companies)
+    if not os.path.exists(path):
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        baseline = {**report, "results": {}}
+    else:
+        with open(path) as f:
+            baseline = json.load(f)
+    added = [name for name in report["results"] if name not in baseline["results"]]
+    baseline["results"].update({name: report["results"][name] for name in added})
+    with open(path, "w") as f:
+        json.dump(baseline, f, indent=2)
+    return added
+
+
+def compare(results: dict, baseline: dict, tolerance: float, min_delta_ms: float) -> list:
+    """Names of benchmarks whose p50 regressed beyond tolerance (and min_delta_ms)."""
+    regressions = []
+    for name, current in results.items():
+        base = baseline["results"].get(name)
+        if base is None:
+            print(f"  {name:34s} {current['p50_ms']:10.3f} ms   (no baseline)")
+            continue
+        ratio = current["p50_ms"] / base["p50_ms"] if base["p50_ms"] else 1.0
+        slower = ratio > 1 + tolerance and current["p50_ms"] - base["p50_ms"] > min_delta_ms
+        mark = "❌" if slower else "✅"
+        print(f"{mark} {name:34s} {current['p50_ms']:10.3f} ms   baseline {base['p50_ms']:10.3f} ms   x{ratio:.2f}")
+        if slower:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="10,1000", help="comma-separated company counts, e.g. 10,1000,100000")
+    parser.add_argument("--dim", type=int, default=DEFAULT_DIM)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--min-time", type=float, default=1.0, help="seconds per benchmark")
+    parser.add_argument("--save", action="store_true", help="write results as the new baselines")
+    parser.add_argument("--save-new", action="store_true", help="add results for benchmarks missing from the baselines")
+    parser.add_argument("--compare", action="store_true", help="fail on regressions against the baselines")
+    parser.add_argument("--tolerance", type=float, default=float(os.getenv("BENCH_TOLERANCE", 0.5)))
+    parser.add_argument("--min-delta-ms", type=float, default=0.05, help="ignore smaller absolute slowdowns")
+    args = parser.parse_args()
+
+    regressions = []
+    for n in (int(s) for s in args.sizes.split(",")):
+        print(f"\n🏗️  Building synthetic index for {n} companies...")
+        companies, meta = setup_tier(n, args.dim, args.seed)
+        print(f"   {meta['chunks']} chunks, built in {meta['build_s']}s, line-item store {meta['line_item_store_s']}s")
+        results = run_tier(companies, args.min_time, args.seed)
+
+        report = {
+            "companies": n,
+            "meta": {
+                **meta,
+                "dim": args.dim,
+                "seed": args.seed,
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "cpu_count": os.cpu_count(),
+            },
+            "results": results,
+        }
+        if args.compare and os.path.exists(baseline_path(n)):
+            with open(baseline_path(n)) as f:
+                regressions += [f"{n}:{name}" for name in compare(results, json.load(f), args.tolerance, args.min_delta_ms)]
+        else:
+            for name, r in results.items():
+                print(f"  {name:34s} p50 {r['p50_ms']:10.3f} ms   p95 {r['p95_ms']:10.3f} ms   {r['ops_per_s']:10.1f} ops/s")
+        if args.save:
+            os.makedirs(BASELINE_DIR, exist_ok=True)
+            with open(baseline_path(n), "w") as f:
+                json.dump(report, f, indent=2)
+            print(f"💾 Saved baseline {baseline_path(n)}")
+        elif args.save_new:
+            added = save_new(n, report)
+            print(f"💾 Added {', '.join(added) or 'nothing'} to {baseline_path(n)}")
+
+    if regressions:
+        print(f"\n❌ Regressions: {', '.join(regressions)}")
+        sys.exit(1)
+    print("\n✅ Done")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+import numpy as np
+import faiss
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+from build_index import render_chunk, statement_label
+from kpi_fetch_doc_items import BS_ITEMS, CF_ITEMS, PL_ITEMS
+from benchmarks.fakes import HashEmbeddings
+
+# Line items per statement_type: everything the KPI fetchers ask for, plus a
+# few extras so partitions aren't exactly the requested set
+STATEMENTS = {
+    "balance_sheet": BS_ITEMS + ["Trade receivables", "Cash and cash equivalents", "Other current assets"],
+    "profit_and_loss": PL_ITEMS + ["Other income", "Employee benefits expense", "Tax expense"],
+    "cash_flows": CF_ITEMS + ["Interest paid", "Proceeds from borrowings"],
+}
+
+# Alternate phrasings real filings use; these miss the structured store and
+# exercise the embedding + FAISS fallback
+ALIASES = {
+    "Inventories": "Inventories (net)",
+    "Total Equity": "Total equity attributable to owners",
+    "Revenue from operations": "Revenue from operations (net)",
+    "Profit for the year": "Profit for the period",
+    "Depreciation and amortization": "Depreciation and amortisation expense",
+    "Dividends paid": "Dividend paid",
+    "Purchase of property, plant and equipment": "Purchase of PPE",
+}
+
+ALIAS_RATE = 0.15  # chance a company uses the alias for an aliased item
+DROP_RATE = 0.03   # chance a company omits a line item altogether
+
+
+def company_name(i: int) -> str:
+    return f"Synth{i:06d} Industries"
+
+
+def build_rows(n_companies: int, seed: int = 0):
+    """[(company, statement_type, line_item, fy24, fy23)] for n synthetic companies."""
+    rng = np.random.default_rng(seed)
+    layout = [(st, item) for st, items in STATEMENTS.items() for item in items]
+    # All draws up front, one (companies x line items) matrix each
+    shape = (n_companies, len(layout))
+    keep = rng.random(shape) >= DROP_RATE
+    alias = rng.random(shape) < ALIAS_RATE
+    scale = 10 ** rng.uniform(2, 6, size=(n_companies, 1, 1))
+    values = np.round(scale * rng.uniform(-0.2, 1.0, size=shape + (2,)), 2).tolist()
+
+    rows = []
+    for c in range(n_companies):
+        company = company_name(c)
+        for j, (statement_type, item) in enumerate(layout):
+            if not keep[c, j]:
+                continue
+            if alias[c, j]:
+                item = ALIASES.get(item, item)
+            fy24, fy23 = values[c][j]
+            rows.append((company, statement_type, item, fy24, fy23))
+    return rows
+
+
+def build_vectorstore(n_companies: int, dim: int = 64, seed: int = 0):
+    """
+    In-memory FAISS store over n synthetic companies in the production chunk
+    format, embedded with HashEmbeddings. Vectors are composed from per-part
+    token sums (identical to embedding each chunk, but vectorised). The 100k
+    tier is ~2.5M chunks and needs several GB of RAM.
+    """
+    embeddings = HashEmbeddings(dim)
+    rows = build_rows(n_companies, seed)
+
+    def part_matrix(names):
+        names = list(dict.fromkeys(names))
+        lookup = {name: i for i, name in enumerate(names)}
+        return lookup, np.stack([embeddings.raw(name) for name in names])
+
+    companies, company_vecs = part_matrix(r[0] for r in rows)
+    statements, statement_vecs = part_matrix(statement_label(r[1]) for r in rows)
+    items, item_vecs = part_matrix(r[2] for r in rows)
+    years = embeddings.raw("FY24 FY23")
+
+    vectors = (
+        company_vecs[[companies[r[0]] for r in rows]]
+        + statement_vecs[[statements[statement_label(r[1])] for r in rows]]
+        + item_vecs[[items[r[2]] for r in rows]]
+        + years
+    )
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    index = faiss.IndexFlatL2(dim)
+    index.add(vectors)
+    docstore = InMemoryDocstore({
+        str(i): Document(page_content=render_chunk(company, statement_type, item, {2024: fy24, 2023: fy23}))
+        for i, (company, statement_type, item, fy24, fy23) in enumerate(rows)
+    })
+    store = FAISS(
+        embedding_function=embeddings,
+        index=index,
+        docstore=docstore,
+        index_to_docstore_id={i: str(i) for i in range(len(rows))},
+    )
+    return store, [company_name(c) for c in range(n_companies)]
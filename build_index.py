@@ -0,0 +1,276 @@
+"""
+Incremental index builder: python build_index.py [--company NAME ...] [--prune] [--dry-run]
+                                                 [--index-type flat|ivf_flat|hnsw|ivf_pq] [--pca DIM]
+
+Streams financial_statements from Postgres, renders each row in the chunk
+format the retrieval code parses, and embeds only rows that are new or
+whose text changed since the last run (tracked by content hash in
+index_manifest.json next to the index). Changed rows replace their old
+vectors; --prune also drops chunks whose rows no longer exist.
+
+index.faiss / index.pkl always hold exact vectors. --index-type / --pca
+(or an existing compact serving copy) also (re)writes the mmap'd serving
+format from compact_index.py with that approximate index type.
+"""
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+import compact_index
+import index_types
+import vector_store
+from fiscal_years import label, row_years
+from line_item_store import normalize, parse_chunk
+
+MANIFEST_NAME = "index_manifest.json"
+
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", 256))
+EMBED_WORKERS = int(os.getenv("EMBED_WORKERS", 4))
+EMBED_MAX_RPM = float(os.getenv("EMBED_MAX_RPM", 300))  # embedding requests per minute, 0 = unlimited
+
+
+def statement_label(statement_type: str) -> str:
+    return statement_type.replace("_", " ").title()
+
+
+def render_chunk(company, statement_type, line_item, years: dict) -> str:
+    """'Company | Statement | Line item | FY24 = x, FY23 = y, ...' from {year: value}, newest first, leaving out missing years."""
+    values = [f"{label(year)} = {years[year]}" for year in sorted(years, reverse=True) if years[year] is not None]
+    return f"{company} | {statement_label(statement_type)} | {line_item} | {', '.join(values)}"
+
+
+def row_key(company, statement, line_item) -> str:
+    # statement_type ('balance_sheet') and chunk label ('Balance Sheet') give the same key
+    return "|".join(normalize(p) for p in (company, statement, line_item))
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+# ---------- Manifest ----------
+
+def _manifest_from_store(store) -> dict:
+    """Rebuild {row key: {"hashes", "ids"}} from the chunks already in the docstore."""
+    rows = {}
+    for _, doc_id in sorted(store.index_to_docstore_id.items()):
+        text = getattr(store.docstore.search(doc_id), "page_content", "")
+        parsed = parse_chunk(text)
+        if parsed is None:
+            continue
+        entry = rows.setdefault(row_key(*parsed[:3]), {"hashes": [], "ids": []})
+        entry["hashes"].append(content_hash(text))
+        entry["ids"].append(doc_id)
+    for entry in rows.values():
+        entry["hashes"].sort()
+    return rows
+
+
+def load_manifest(index_dir: str, store) -> dict:
+    """
+    Row manifest for the index in index_dir. If it's missing or was written
+    for different index files (e.g. a run died between the two writes), it
+    is rebuilt from the docstore so nothing gets embedded twice.
+    """
+    if store is None:
+        return {}
+    path = os.path.join(index_dir, MANIFEST_NAME)
+    if os.path.exists(path):
+        with open(path) as f:
+            manifest = json.load(f)
+        if manifest.get("index_version") == vector_store._content_hash(index_dir):
+            return manifest["rows"]
+    print("ℹ️  Manifest missing or stale; rebuilding it from the docstore")
+    return _manifest_from_store(store)
+
+
+def save_manifest(index_dir: str, rows: dict):
+    path = os.path.join(index_dir, MANIFEST_NAME)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump({"index_version": vector_store._content_hash(index_dir), "rows": rows}, f)
+    os.replace(tmp, path)
+
+
+# ---------- Embedding ----------
+
+class RateLimiter:
+    """Spaces calls at least 60 / per_minute seconds apart, across threads."""
+
+    def __init__(self, per_minute: float):
+        self.interval = 60.0 / per_minute if per_minute else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            at = max(now, self._next)
+            self._next = at + self.interval
+        if at > now:
+            time.sleep(at - now)
+
+
+def embed_parallel(embeddings, texts, batch_size: int = EMBED_BATCH_SIZE,
+                   workers: int = EMBED_WORKERS, max_rpm: float = EMBED_MAX_RPM):
+    """embed_documents over fixed-size batches on a thread pool; vectors in input order."""
+    limiter = RateLimiter(max_rpm)
+    batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+
+    def embed(batch):
+        limiter.wait()
+        return embeddings.embed_documents(batch)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return [vec for batch in pool.map(embed, batches) for vec in batch]
+
+
+# ---------- Sync ----------
+
+def plan_changes(rows, manifest: dict, companies=None, prune: bool = False):
+    """
+    Compare rows with the manifest. Returns (to_add, to_delete, stale_keys):
+    to_add is [(key, chunk text)], to_delete the doc ids being replaced or
+    pruned. Pruning is limited to `companies` when a filter was given.
+
+    Statements can repeat a line item (e.g. current and non-current
+    "Trade receivables"), so a key is compared as the set of its chunks and
+    replaced as a whole when any of them changed.
+    """
+    texts_by_key = {}
+    for row in rows:
+        key = row_key(row["company"], row["statement_type"], row["line_item"])
+        texts_by_key.setdefault(key, []).append(render_chunk(
+            row["company"], row["statement_type"], row["line_item"], row_years(row),
+        ))
+
+    to_add, to_delete = [], []
+    for key, texts in texts_by_key.items():
+        entry = manifest.get(key)
+        if entry is not None and entry["hashes"] == sorted(content_hash(t) for t in texts):
+            continue
+        if entry is not None:
+            to_delete.extend(entry["ids"])
+        to_add.extend((key, text) for text in texts)
+    seen = texts_by_key.keys()
+
+    stale = []
+    if prune:
+        scope = {normalize(c) for c in companies} if companies else None
+        stale = [k for k in manifest if k not in seen and (scope is None or k.split("|")[0] in scope)]
+        for key in stale:
+            to_delete.extend(manifest[key]["ids"])
+    return to_add, to_delete, stale
+
+
+def sync_index(rows, index_dir: str = None, embeddings=None, companies=None,
+               prune: bool = False, dry_run: bool = False,
+               index_type: str = None, pca_dim: int = None, **embed_kwargs) -> dict:
+    """
+    Apply new/changed rows to the index in index_dir and save it. Returns counts.
+    index_type / pca_dim select the serving index; None keeps the current one.
+    """
+    from langchain_community.vectorstores import FAISS
+
+    index_dir = index_dir or vector_store.INDEX_DIR
+    if embeddings is None:
+        embeddings = vector_store.get_embeddings()
+    # Document vectors go straight to the model, not into the query-embedding cache
+    embeddings = getattr(embeddings, "underlying", embeddings)
+
+    exists = os.path.exists(os.path.join(index_dir, "index.faiss"))
+    store = vector_store._load(index_dir, embeddings, writable=True) if exists else None
+    manifest = load_manifest(index_dir, store)
+
+    to_add, to_delete, stale = plan_changes(rows, manifest, companies, prune)
+    summary = {"added": len(to_add), "deleted": len(to_delete), "pruned": len(stale)}
+
+    serving = compact_index.read_meta(index_dir) if compact_index.exists(index_dir) else None
+    if serving is not None:
+        # An existing serving copy keeps its layout unless another one is asked for
+        index_type = serving.get("index_type", "flat") if index_type is None else index_type
+        pca_dim = serving.get("pca_dim", 0) if pca_dim is None else pca_dim
+    write_serving = index_type is not None or pca_dim is not None
+    relayout = write_serving and (
+        serving is None or (index_type, pca_dim) != (serving.get("index_type", "flat"), serving.get("pca_dim", 0))
+    )
+
+    if dry_run or not (to_add or to_delete or relayout) or (store is None and not to_add):
+        return summary
+
+    if to_delete:
+        store.delete(to_delete)
+    for key in stale:
+        del manifest[key]
+
+    if to_add:
+        texts = [text for _, text in to_add]
+        vectors = embed_parallel(embeddings, texts, **embed_kwargs)
+        ids = [str(uuid.uuid4()) for _ in to_add]
+        pairs = list(zip(texts, vectors))
+        if store is None:
+            store = FAISS.from_embeddings(pairs, embeddings, ids=ids)
+        else:
+            store.add_embeddings(pairs, ids=ids)
+        replaced = {key for key, _ in to_add}
+        for key in replaced:
+            manifest[key] = {"hashes": [], "ids": []}
+        for (key, text), doc_id in zip(to_add, ids):
+            manifest[key]["hashes"].append(content_hash(text))
+            manifest[key]["ids"].append(doc_id)
+        for key in replaced:
+            manifest[key]["hashes"].sort()
+
+    os.makedirs(index_dir, exist_ok=True)
+    store.save_local(index_dir)
+    save_manifest(index_dir, manifest)
+    if write_serving:
+        # Keep the mmap'd serving copy in step with index.pkl
+        compact_index.write(store, index_dir, vector_store._content_hash(index_dir),
+                            index_type or "flat", pca_dim or 0)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--company", action="append", help="only sync this company (repeatable)")
+    parser.add_argument("--index-dir", default=vector_store.INDEX_DIR)
+    parser.add_argument("--prune", action="store_true", help="delete chunks whose rows are gone")
+    parser.add_argument("--dry-run", action="store_true", help="report changes without embedding")
+    parser.add_argument("--batch-size", type=int, default=EMBED_BATCH_SIZE)
+    parser.add_argument("--workers", type=int, default=EMBED_WORKERS)
+    parser.add_argument("--max-rpm", type=float, default=EMBED_MAX_RPM)
+    parser.add_argument("--index-type", choices=index_types.INDEX_TYPES,
+                        help="serving index type (default: keep the current one)")
+    parser.add_argument("--pca", type=int, help="project serving vectors to this many dims (0 = off)")
+    args = parser.parse_args()
+
+    from db_utils import close_pool, iter_financial_rows
+
+    start = time.perf_counter()
+    try:
+        summary = sync_index(
+            iter_financial_rows(args.company),
+            index_dir=args.index_dir,
+            companies=args.company,
+            prune=args.prune,
+            dry_run=args.dry_run,
+            batch_size=args.batch_size,
+            workers=args.workers,
+            max_rpm=args.max_rpm,
+            index_type=args.index_type,
+            pca_dim=args.pca,
+        )
+    finally:
+        close_pool()
+    verb = "Would apply" if args.dry_run else "Applied"
+    print(f"✅ {verb}: {summary['added']} added/updated, {summary['deleted']} vectors removed "
+          f"({summary['pruned']} pruned rows) in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
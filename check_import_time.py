@@ -0,0 +1,54 @@
+"""
+Cold-start budget check: python check_import_time.py [module] [--budget-ms N]
+
+Runs `python -X importtime -c "import <module>"` in a fresh interpreter,
+prints the slowest imports and exits non-zero if the module's cumulative
+import time exceeds the budget (IMPORT_BUDGET_MS, default 1000 ms).
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def measure(module: str):
+    """[(cumulative_us, self_us, name)] for every import, slowest first."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BASE_DIR, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise SystemExit(f"❌ import {module} failed:\n{proc.stderr[-2000:]}")
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative_us), int(self_us), name.strip()))
+    return sorted(rows, reverse=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("module", nargs="?", default="graphql_server")
+    parser.add_argument("--budget-ms", type=float, default=float(os.getenv("IMPORT_BUDGET_MS", 1000)))
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    rows = measure(args.module)
+    total_ms = next(cum for cum, _, name in rows if name == args.module) / 1000
+
+    print(f"Slowest imports under {args.module} (cumulative ms):")
+    for cum, _, name in rows[:args.top]:
+        print(f"  {cum / 1000:8.1f}  {name}")
+
+    if total_ms > args.budget_ms:
+        print(f"❌ import {args.module}: {total_ms:.0f} ms > budget {args.budget_ms:.0f} ms")
+        sys.exit(1)
+    print(f"✅ import {args.module}: {total_ms:.0f} ms (budget {args.budget_ms:.0f} ms)")
+
+
+if __name__ == "__main__":
+    main()
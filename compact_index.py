@@ -0,0 +1,187 @@
+"""
+Compact, memory-mapped serving format for the FAISS index.
+
+    python compact_index.py [index_dir] [--index-type flat|ivf_flat|hnsw|ivf_pq] [--pca DIM]
+
+converts index.faiss + index.pkl into:
+  chunks.bin           one UTF-8 JSON record [doc_id, text, metadata] per FAISS position
+  chunks.offsets.npy   int64 byte offsets, len = count + 1
+  chunks.json          {"format", "count", "version", "index_type", "pca_dim", "index_file"}
+  index.serving.faiss  only for non-flat types: an approximate index (optionally
+                       behind a PCA projection) trained on the flat vectors
+
+The serving index is then opened with FAISS's mmap IO flags and the chunk
+file is mmap'd too, so startup reads no vectors or documents and every
+worker on the host shares the same page-cache copy. No pickle is involved
+when loading. index.pkl / index.faiss stay the exact, writable master copy
+that build_index.py updates.
+"""
+import json
+import mmap
+import os
+from collections.abc import Mapping
+import faiss
+import numpy as np
+import index_types
+from langchain_community.docstore.base import Docstore
+from langchain_core.documents import Document
+
+CHUNKS_NAME = "chunks.bin"
+OFFSETS_NAME = "chunks.offsets.npy"
+META_NAME = "chunks.json"
+SERVING_NAME = "index.serving.faiss"
+FORMAT_VERSION = 1
+
+
+def exists(index_dir: str) -> bool:
+    return os.path.exists(os.path.join(index_dir, META_NAME))
+
+
+def read_meta(index_dir: str) -> dict:
+    with open(os.path.join(index_dir, META_NAME)) as f:
+        return json.load(f)
+
+
+class CompactDocstore(Docstore):
+    """Read-only docstore over chunks.bin; document ids are FAISS positions ("0", "1", ...)."""
+
+    def __init__(self, index_dir: str):
+        self._file = open(os.path.join(index_dir, CHUNKS_NAME), "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        # mmap can't map an empty file (an index with no chunks)
+        self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        self._offsets = np.load(os.path.join(index_dir, OFFSETS_NAME), mmap_mode="r")
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def record(self, position: int):
+        """(original doc id, text, metadata) stored at a FAISS position."""
+        start, end = self._offsets[position], self._offsets[position + 1]
+        return json.loads(self._data[start:end])
+
+    def search(self, search: str):
+        try:
+            position = int(search)
+        except (TypeError, ValueError):
+            return f"ID {search} not found."
+        if not 0 <= position < len(self):
+            return f"ID {search} not found."
+        doc_id, text, metadata = self.record(position)
+        return Document(id=doc_id, page_content=text, metadata=metadata)
+
+
+class PositionalIds(Mapping):
+    """index_to_docstore_id for a CompactDocstore: position -> str(position), without a dict."""
+
+    def __init__(self, count: int):
+        self._count = count
+
+    def __getitem__(self, position):
+        if not 0 <= position < self._count:
+            raise KeyError(position)
+        return str(position)
+
+    def __iter__(self):
+        return iter(range(self._count))
+
+    def __len__(self):
+        return self._count
+
+
+def load(index_dir: str, embeddings):
+    """FAISS vector store over the mmap'd index and chunk file (read-only)."""
+    from langchain_community.vectorstores import FAISS
+
+    meta = read_meta(index_dir)
+    index = faiss.read_index(
+        os.path.join(index_dir, meta.get("index_file", "index.faiss")),
+        faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY,
+    )
+    index_types.configure(index)
+    docstore = CompactDocstore(index_dir)
+    if len(docstore) != index.ntotal:
+        raise ValueError(
+            f"{index_dir}: {META_NAME} has {len(docstore)} chunks but index.faiss has "
+            f"{index.ntotal} vectors; rerun compact_index.py"
+        )
+    return FAISS(
+        embedding_function=embeddings,
+        index=index,
+        docstore=docstore,
+        index_to_docstore_id=PositionalIds(len(docstore)),
+    )
+
+
+def write(store, index_dir: str, version: str, index_type: str = "flat", pca_dim: int = 0):
+    """
+    Write the chunk files for `store` (any langchain FAISS store) in FAISS
+    position order, plus a serving index of `index_type` when it isn't flat.
+    """
+    index_file = "index.faiss"
+    if index_type != "flat" or pca_dim:
+        vectors = store.index.reconstruct_n(0, store.index.ntotal)
+        serving = index_types.build(vectors, index_type, pca_dim, store.index.metric_type)
+        tmp_serving = os.path.join(index_dir, SERVING_NAME + ".tmp")
+        faiss.write_index(serving, tmp_serving)
+        os.replace(tmp_serving, os.path.join(index_dir, SERVING_NAME))
+        index_file = SERVING_NAME
+
+    offsets = [0]
+    tmp_chunks = os.path.join(index_dir, CHUNKS_NAME + ".tmp")
+    with open(tmp_chunks, "wb") as f:
+        for position in range(store.index.ntotal):
+            doc_id = store.index_to_docstore_id[position]
+            doc = store.docstore.search(doc_id)
+            record = json.dumps([doc_id, doc.page_content, doc.metadata], ensure_ascii=False).encode("utf-8")
+            f.write(record)
+            offsets.append(offsets[-1] + len(record))
+
+    tmp_offsets = os.path.join(index_dir, OFFSETS_NAME + ".tmp.npy")
+    np.save(tmp_offsets, np.array(offsets, dtype=np.int64))
+    os.replace(tmp_chunks, os.path.join(index_dir, CHUNKS_NAME))
+    os.replace(tmp_offsets, os.path.join(index_dir, OFFSETS_NAME))
+
+    # Written last: its presence switches vector_store to this format
+    meta = {
+        "format": FORMAT_VERSION,
+        "count": store.index.ntotal,
+        # Results can differ between layouts, so they must not share a cache version
+        "version": version if index_file == "index.faiss" else f"{version}-{index_type}-pca{pca_dim}",
+        "index_type": index_type,
+        "pca_dim": pca_dim,
+        "index_file": index_file,
+    }
+    tmp_meta = os.path.join(index_dir, META_NAME + ".tmp")
+    with open(tmp_meta, "w") as f:
+        json.dump(meta, f)
+    os.replace(tmp_meta, os.path.join(index_dir, META_NAME))
+    if index_file != SERVING_NAME and os.path.exists(os.path.join(index_dir, SERVING_NAME)):
+        os.remove(os.path.join(index_dir, SERVING_NAME))  # left over from a non-flat build
+    return meta
+
+
+def convert(index_dir: str, index_type: str = "flat", pca_dim: int = 0):
+    """index.pkl -> compact chunk files, versioned by the source index's content hash."""
+    from langchain_community.vectorstores import FAISS
+    from langchain_core.embeddings import FakeEmbeddings
+    from vector_store import _content_hash
+
+    # Embeddings are never called here; the store only needs a placeholder
+    store = FAISS.load_local(index_dir, FakeEmbeddings(size=1), allow_dangerous_deserialization=True)
+    return write(store, index_dir, _content_hash(index_dir), index_type, pca_dim)
+
+
+if __name__ == "__main__":
+    import argparse
+    from vector_store import INDEX_DIR
+
+    parser = argparse.ArgumentParser(description="Convert index.pkl to the compact mmap'd format")
+    parser.add_argument("index_dir", nargs="?", default=INDEX_DIR)
+    parser.add_argument("--index-type", choices=index_types.INDEX_TYPES, default=index_types.FAISS_INDEX_TYPE)
+    parser.add_argument("--pca", type=int, default=index_types.FAISS_PCA_DIM, help="project to this many dims first")
+    args = parser.parse_args()
+
+    meta = convert(args.index_dir, args.index_type, args.pca)
+    print(f"✅ Wrote {meta['count']} chunks to {os.path.join(args.index_dir, CHUNKS_NAME)} "
+          f"({meta['index_type']} index{', PCA %d' % meta['pca_dim'] if meta['pca_dim'] else ''}, version {meta['version']})")
@@ -1,7 +1,14 @@
 import os
+import asyncio
+import threading
+import time
+from contextlib import contextmanager
 import psycopg2
+from psycopg2 import pool as pg_pool
 from decimal import Decimal, InvalidOperation
 from dotenv import load_dotenv
+from metrics import timed
+from fiscal_years import year_columns
 import math
 
 load_dotenv()
@@ -12,6 +19,17 @@ DB_USER = os.getenv("DB_USER")
 DB_PASSWORD = os.getenv("DB_PASSWORD")
 DB_PORT = os.getenv("DB_PORT", 5432)
 
+DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", 1))
+DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", 10))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 10))      # seconds to wait for a free connection
+DB_POOL_PING_AFTER = float(os.getenv("DB_POOL_PING_AFTER", 30))  # idle seconds before a SELECT 1 check
+
+_pool = None
+_slots = None       # bounds checkouts so callers wait instead of hitting PoolError
+_last_used = {}     # id(conn) -> time it was returned to the pool
+_pool_lock = threading.Lock()
+_year_columns = None  # fy_YYYY columns of financial_statements, newest first
+
 def safe_float(value):
     try:
         if value is None:
@@ -23,28 +41,153 @@ def safe_float(value):
     except (ValueError, InvalidOperation, TypeError):
         return None
 
+# ---------- Connection pool ----------
+
+def init_pool(minconn: int = DB_POOL_MIN, maxconn: int = DB_POOL_MAX, pool=None):
+    """
+    Create the shared connection pool. `pool` may be any drop-in object with
+    getconn()/putconn(conn, close=False)/closeall(), e.g. for tests.
+    """
+    global _pool, _slots
+    with _pool_lock:
+        if _pool is not None:
+            return _pool
+        if pool is None:
+            pool = pg_pool.ThreadedConnectionPool(
+                minconn, maxconn,
+                host=DB_HOST, dbname=DB_NAME, user=DB_USER, password=DB_PASSWORD, port=DB_PORT
+            )
+        _pool = pool
+        _slots = threading.BoundedSemaphore(maxconn)
+        return _pool
+
+
+def close_pool():
+    """Close every pooled connection (FastAPI shutdown)."""
+    global _pool, _slots
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+        _pool = None
+        _slots = None
+        _last_used.clear()
+
+
+def _healthy(conn) -> bool:
+    if conn.closed:
+        return False
+    if time.monotonic() - _last_used.get(id(conn), 0) < DB_POOL_PING_AFTER:
+        return True
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT 1")
+        conn.rollback()
+        return True
+    except psycopg2.Error:
+        return False
+
+
+@contextmanager
+def pooled_connection():
+    """Borrow a healthy connection from the pool; stale ones are replaced."""
+    pool = _pool or init_pool()
+    slots = _slots
+    if not slots.acquire(timeout=DB_POOL_TIMEOUT):
+        raise pg_pool.PoolError(f"no database connection free after {DB_POOL_TIMEOUT}s")
+    try:
+        conn = pool.getconn()
+        if not _healthy(conn):
+            _last_used.pop(id(conn), None)
+            pool.putconn(conn, close=True)
+            conn = pool.getconn()
+        broken = False
+        try:
+            yield conn
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            broken = True
+            raise
+        finally:
+            if broken:
+                _last_used.pop(id(conn), None)
+            else:
+                _last_used[id(conn)] = time.monotonic()
+            # the pool rolls back any open transaction before reuse
+            pool.putconn(conn, close=broken)
+    finally:
+        slots.release()
+
+
+def financial_year_columns():
+    """
+    The table's fy_YYYY columns, newest first; adding a year is just adding
+    a column. Looked up once per process. Only names of the exact fy_YYYY
+    form pass year_columns, so they are safe to put into the SELECT list.
+    """
+    global _year_columns
+    if _year_columns is None:
+        with pooled_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    SELECT column_name
+                    FROM information_schema.columns
+                    WHERE table_name = 'financial_statements'
+                      AND table_schema = current_schema()
+                """)
+                _year_columns = year_columns(r[0] for r in cur.fetchall())
+    return _year_columns
+
+
+@timed("postgres")
 def get_financial_data(company: str, statement_type: str):
-    conn = psycopg2.connect(
-        host=DB_HOST, dbname=DB_NAME, user=DB_USER, password=DB_PASSWORD, port=DB_PORT
-    )
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT line_item, fy_2024, fy_2023
-        FROM financial_statements
-        WHERE company = %s AND statement_type = %s
-    """, (company, statement_type))
-    rows = cur.fetchall()
-    cur.close()
-    conn.close()
+    years = financial_year_columns()
+    with pooled_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(f"""
+                SELECT line_item, {", ".join(years)}
+                FROM financial_statements
+                WHERE company = %s AND statement_type = %s
+            """, (company, statement_type))
+            rows = cur.fetchall()
     return [
         {
             "line_item": r[0],
-            "fy_2024": safe_float(r[1]),
-            "fy_2023": safe_float(r[2])
+            **{col: safe_float(v) for col, v in zip(years, r[1:])},
         }
         for r in rows
     ]
 
+
+async def aget_financial_data(company: str, statement_type: str):
+    """get_financial_data without blocking the event loop (bounded by the pool size)."""
+    return await asyncio.to_thread(get_financial_data, company, statement_type)
+
+
+def iter_financial_rows(companies=None, itersize: int = 2000):
+    """
+    Stream financial_statements rows (optionally only some companies) through
+    a server-side cursor, so the whole table is never held in memory.
+    Rows carry one fy_YYYY key per year column.
+    """
+    years = financial_year_columns()
+    query = f"SELECT company, statement_type, line_item, {', '.join(years)} FROM financial_statements"
+    params = ()
+    if companies:
+        query += " WHERE company = ANY(%s)"
+        params = (list(companies),)
+    query += " ORDER BY company, statement_type, line_item"
+
+    with pooled_connection() as conn:
+        with conn.cursor(name="financial_statements_stream") as cur:
+            cur.itersize = itersize
+            cur.execute(query, params)
+            for r in cur:
+                yield {
+                    "company": r[0],
+                    "statement_type": r[1],
+                    "line_item": r[2],
+                    **{col: safe_float(v) for col, v in zip(years, r[3:])},
+                }
+
 def test_connection():
     try:
         conn = psycopg2.connect(
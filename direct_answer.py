@@ -0,0 +1,233 @@
+"""
+Direct answers for plain line-item lookups ("Give me Total Current Assets
+for Infosys", "ITC total equity FY24").
+
+match_question() parses a question into (company, line item, years)
+against the structured line-item store. It returns a Lookup only when
+exactly one company is named, nothing asks for analysis (change, growth,
+comparison, ...) and the words left over match one line item's words
+closely enough. The answer is then templated from the chunk's own values,
+with no retrieval, embedding or LLM call. Anything else returns None and
+goes down the normal RAG path.
+"""
+import functools
+import math
+import os
+import re
+import threading
+from fiscal_years import label
+
+# Jaccard similarity between the question's leftover words and a line item's
+# words; a value above 1 turns the fast path off
+DIRECT_ANSWER_THRESHOLD = float(os.getenv("DIRECT_ANSWER_THRESHOLD", 0.8))
+
+_WORD = re.compile(r"[\w&]+")
+_FY_WORD = re.compile(r"fy\d+")
+_YEAR_PATTERNS = (
+    re.compile(r"\bfy\s*'?(\d{4}|\d{2})\b"),        # FY24, FY 2024, FY'24
+    re.compile(r"\b20\d{2}\s*[-–/]\s*(\d{2})\b"),   # 2023-24: the year ending 2024
+    re.compile(r"\b((?:19|20)\d{2})\b"),             # 2024
+)
+
+# Words that carry no line-item meaning in a lookup
+STOPWORDS = frozenset("""
+    a about an and are as at be been by can did do does fy for from get give
+    had has have how i in is it its know latest me much need of on please
+    report reported s show tell the their there to us value values was were
+    what whats which year years you figure figures amount number financial fiscal
+""".split())
+
+# Words that make a question more than a lookup; they send it to the LLM
+ANALYSIS_WORDS = frozenset("""
+    why change changed changes compare compared comparison versus vs between
+    trend growth grew grow increase increased decrease decreased difference
+    ratio margin explain analysis analyse analyze should could would better
+    worse average percent percentage yoy cagr improve improved declined
+""".split())
+
+# Statement names a question may use to pick one statement
+STATEMENT_HINTS = {
+    "balance sheet": "balance sheet",
+    "profit and loss": "profit and loss",
+    "p&l": "profit and loss",
+    "p & l": "profit and loss",
+    "income statement": "profit and loss",
+    "cash flow statement": "cash flows",
+    "cash flows statement": "cash flows",
+    "statement of cash flows": "cash flows",
+}
+
+
+def _words(text: str) -> str:
+    return " ".join(_WORD.findall(text.lower()))
+
+
+def _stem(word: str) -> str:
+    return word[:-1] if len(word) > 3 and word.endswith("s") and not word.endswith("ss") else word
+
+
+@functools.lru_cache(maxsize=4096)
+def _tokens(text: str) -> frozenset:
+    """Content words of a line item or question, singularised."""
+    return frozenset(
+        _stem(w) for w in _words(text).split()
+        if w not in STOPWORDS and not w.isdigit() and not _FY_WORD.fullmatch(w)
+    )
+
+
+def _years(text: str) -> set:
+    years = set()
+    for pattern in _YEAR_PATTERNS:
+        for year in pattern.findall(text):
+            years.add(int(year) if len(year) == 4 else 2000 + int(year))
+        text = pattern.sub(" ", text)
+    return years
+
+
+def _format(value: float) -> str:
+    return f"{value:,.2f}"
+
+
+class Lookup:
+    """A question resolved to one line item of one company."""
+
+    def __init__(self, company, statement, line_item, values: dict, years, position, confidence):
+        self.company = company
+        self.statement = statement
+        self.line_item = line_item
+        self.values = values  # {year: value} for the years answered, newest first
+        self.years = years    # years the question named (empty: all available)
+        self.position = position  # FAISS position of the source chunk
+        self.confidence = confidence
+
+    def answer(self) -> str:
+        if len(self.values) == 1:
+            (year, value), = self.values.items()
+            return f"{self.line_item} for {self.company} in {label(year)} was {_format(value)} ({self.statement})."
+        figures = ", ".join(f"{label(year)} = {_format(value)}" for year, value in self.values.items())
+        return f"{self.line_item} for {self.company} ({self.statement}): {figures}."
+
+
+class _Catalog:
+    """Rows of the line-item store grouped by normalised company name, and every line-item word."""
+
+    def __init__(self, store):
+        self.rows = {}
+        for row, company in enumerate(store.companies):
+            self.rows.setdefault(_words(company), []).append(row)
+        self.max_words = max((len(name.split()) for name in self.rows), default=0)
+        self.item_words = frozenset().union(*(_tokens(item) for item in set(store.line_items)))
+
+    def companies_in(self, words: list) -> set:
+        """Companies named in the question, dropping names inside a longer named one."""
+        found = set()
+        for n in range(1, self.max_words + 1):
+            for i in range(len(words) - n + 1):
+                name = " ".join(words[i:i + n])
+                if name in self.rows:
+                    found.add(name)
+        return {c for c in found if not any(c != other and f" {c} " in f" {other} " for other in found)}
+
+
+_lock = threading.Lock()
+_catalog = None
+_source = None
+
+
+def _get_catalog(store) -> _Catalog:
+    global _catalog, _source
+    if _source is not store:
+        with _lock:
+            if _source is not store:
+                _catalog = _Catalog(store)
+                _source = store
+    return _catalog
+
+
+def question_key(query: str):
+    """
+    (companies, line-item words, numbers) a question names, as frozensets.
+    Two questions answerable by the same answer must agree on all three,
+    e.g. "total assets" and "total current assets" differ in the second.
+    """
+    from line_item_store import get_line_item_store  # faiss, loaded on first use
+
+    catalog = _get_catalog(get_line_item_store())
+    text = _words(query)
+    companies = frozenset(catalog.companies_in(text.split()))
+    padded = f" {text} "
+    for company in companies:
+        padded = padded.replace(f" {company} ", " ")
+    return companies, _tokens(padded) & catalog.item_words, frozenset(re.findall(r"\d+", text))
+
+
+def match_question(query: str, threshold: float = None):
+    """Lookup for a plain (company, line item, year) question, or None if it needs the LLM."""
+    from line_item_store import get_line_item_store, normalize  # faiss, loaded on first use
+
+    threshold = DIRECT_ANSWER_THRESHOLD if threshold is None else threshold
+    if threshold > 1:
+        return None
+    store = get_line_item_store()
+    catalog = _get_catalog(store)
+
+    text = _words(query)
+    words = text.split()
+    if ANALYSIS_WORDS.intersection(words):
+        return None
+    companies = catalog.companies_in(words)
+    if len(companies) != 1:
+        return None
+    company, = companies
+
+    padded = f" {text} "
+    statement = None
+    for hint, name in STATEMENT_HINTS.items():
+        if f" {hint} " in padded:
+            statement = name
+            padded = padded.replace(f" {hint} ", " ")
+    years = _years(query.lower())
+    question = _tokens(padded.replace(f" {company} ", " ")) - _tokens(company)
+    if not question:
+        return None
+
+    scored = []
+    for row in catalog.rows[company]:
+        if statement is not None and normalize(store.statements[row]) != statement:
+            continue
+        item = _tokens(store.line_items[row])
+        if item:
+            scored.append((len(question & item) / len(question | item), row))
+    if not scored:
+        return None
+    best = max(score for score, _ in scored)
+    row = next(row for score, row in scored if score == best)
+    # Ties (e.g. current and non-current "Trade receivables"), and rows of
+    # another statement naming every asked word (the cash flow's movement
+    # in "Trade receivables" vs the balance sheet's), only count as one
+    # answer when they report the same figures
+    rows = [
+        r for score, r in scored
+        if score == best or (store.statements[r] != store.statements[row] and question <= _tokens(store.line_items[r]))
+    ]
+    same = all(
+        all(a == b or (math.isnan(a) and math.isnan(b)) for a, b in zip(store.values[r], store.values[row]))
+        for r in rows
+    )
+    confidence = best if same else best / 2
+    if confidence < threshold:
+        return None
+
+    available = {year: float(v) for year, v in zip(store.years, store.values[row]) if not math.isnan(v)}
+    wanted = sorted(years or available, reverse=True)
+    if not wanted or any(year not in available for year in wanted):
+        return None  # a year the chunk doesn't have: let the LLM say so
+    return Lookup(
+        company=store.companies[row],
+        statement=store.statements[row],
+        line_item=store.line_items[row],
+        values={year: available[year] for year in wanted},
+        years=sorted(years, reverse=True),
+        position=int(store.positions[row]),
+        confidence=confidence,
+    )
@@ -0,0 +1,205 @@
+import asyncio
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+# Outside the package directory, which may be read-only or shipped as-is;
+# vector_store takes EMBEDDING_CACHE_PATH over it ("" disables the cache)
+DEFAULT_CACHE_PATH = os.path.join(tempfile.gettempdir(), "rag-fsi", "embedding_cache.sqlite3")
+DEFAULT_MAX_ENTRIES = 50000
+
+# SQLite caps bound parameters per statement; stay well under it
+_CHUNK = 500
+
+# Recency bumps from reads are written in batches: on put, or once this
+# many are pending, or this many seconds after the last write
+FLUSH_EVERY = 1000
+FLUSH_INTERVAL = 30.0
+
+
+class EmbeddingCache:
+    """
+    Persistent (model, text) -> float32 vector cache in a local SQLite file.
+    Least-recently-used rows are evicted once max_entries is exceeded.
+
+    Reads don't write: the last_used times of hits are kept in memory and
+    flushed in one transaction (see FLUSH_EVERY / FLUSH_INTERVAL), always
+    before an eviction. Bumps not yet flushed when the process dies only
+    make those rows look older.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 flush_every: int = FLUSH_EVERY, flush_interval: float = FLUSH_INTERVAL):
+        self.path = path
+        self.max_entries = max_entries
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._touched = {}  # (model, text) -> last_used not yet written
+        self._flushed_at = time.monotonic()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                text TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (model, text)
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)")
+        self._conn.commit()
+
+    def _flush(self):
+        """Write pending recency bumps; the caller holds the lock and commits."""
+        if self._touched:
+            self._conn.executemany(
+                "UPDATE embeddings SET last_used = ? WHERE model = ? AND text = ?",
+                [(at, model, text) for (model, text), at in self._touched.items()],
+            )
+            self._touched = {}
+        self._flushed_at = time.monotonic()
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+            self._conn.commit()
+
+    def get_many(self, model: str, texts):
+        """Cached vectors for `texts` (None where missing), bumping their recency."""
+        found = {}
+        now = time.time()
+        with self._lock:
+            for i in range(0, len(texts), _CHUNK):
+                chunk = texts[i:i + _CHUNK]
+                marks = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT text, vector FROM embeddings WHERE model = ? AND text IN ({marks})",
+                    (model, *chunk),
+                ).fetchall()
+                found.update(rows)
+            for t in found:
+                self._touched[(model, t)] = now
+            if self._touched and (
+                len(self._touched) >= self.flush_every
+                or time.monotonic() - self._flushed_at >= self.flush_interval
+            ):
+                self._flush()
+                self._conn.commit()
+            hits = sum(1 for t in texts if t in found)
+            self.hits += hits
+            self.misses += len(texts) - hits
+        return [
+            np.frombuffer(found[t], dtype=np.float32).tolist() if t in found else None
+            for t in texts
+        ]
+
+    def put_many(self, model: str, texts, vectors):
+        now = time.time()
+        rows = [
+            (model, t, np.asarray(v, dtype=np.float32).tobytes(), now)
+            for t, v in zip(texts, vectors)
+        ]
+        with self._lock:
+            # Recent reads must count before anything is evicted
+            self._flush()
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, text, vector, last_used) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+            excess = count - self.max_entries
+            if excess > 0:
+                self._conn.execute(
+                    "DELETE FROM embeddings WHERE rowid IN "
+                    "(SELECT rowid FROM embeddings ORDER BY last_used LIMIT ?)",
+                    (excess,),
+                )
+                self.evictions += excess
+            self._conn.commit()
+
+    def stats(self):
+        with self._lock:
+            (size,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / lookups) if lookups else None,
+                "evictions": self.evictions,
+                "size": size,
+                "max_entries": self.max_entries,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM embeddings")
+            self._conn.commit()
+            self._touched = {}
+            self.hits = self.misses = self.evictions = 0
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that only calls the underlying model on cache misses."""
+
+    def __init__(self, underlying: Embeddings, cache: EmbeddingCache, model: str = None):
+        self.underlying = underlying
+        self.cache = cache
+        self.model = model or getattr(underlying, "model", type(underlying).__name__)
+
+    def embed_documents(self, texts):
+        texts = list(texts)
+        vectors = self.cache.get_many(self.model, texts)
+        missing = list(dict.fromkeys(t for t, v in zip(texts, vectors) if v is None))
+        if missing:
+            fresh = dict(zip(missing, self.underlying.embed_documents(missing)))
+            self.cache.put_many(self.model, missing, [fresh[t] for t in missing])
+            vectors = [fresh[t] if v is None else v for t, v in zip(texts, vectors)]
+        return vectors
+
+    def embed_query(self, text):
+        (vector,) = self.cache.get_many(self.model, [text])
+        if vector is None:
+            vector = self.underlying.embed_query(text)
+            self.cache.put_many(self.model, [text], [vector])
+        return vector
+
+    # SQLite I/O runs on a worker thread so it never blocks the event loop
+
+    async def aembed_documents(self, texts):
+        texts = list(texts)
+        vectors = await asyncio.to_thread(self.cache.get_many, self.model, texts)
+        missing = list(dict.fromkeys(t for t, v in zip(texts, vectors) if v is None))
+        if missing:
+            fresh = dict(zip(missing, await self.underlying.aembed_documents(missing)))
+            await asyncio.to_thread(self.cache.put_many, self.model, missing, [fresh[t] for t in missing])
+            vectors = [fresh[t] if v is None else v for t, v in zip(texts, vectors)]
+        return vectors
+
+    async def aembed_query(self, text):
+        (vector,) = await asyncio.to_thread(self.cache.get_many, self.model, [text])
+        if vector is None:
+            vector = await self.underlying.aembed_query(text)
+            await asyncio.to_thread(self.cache.put_many, self.model, [text], [vector])
+        return vector
+
+
+if __name__ == "__main__":
+    # Warm the cache for the canonical KPI queries: python embedding_cache.py HDFC ITC ...
+    from kpi_fetch_doc_items import fetch_all_items
+    from vector_store import get_embeddings
+
+    for company in sys.argv[1:]:
+        fetch_all_items(company)
+        print(f"✅ warmed {company}")
+    print(get_embeddings().cache.stats())
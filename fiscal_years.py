@@ -0,0 +1,57 @@
+import math
+import re
+
+# Chunks label years "FY24"; Postgres and the API use fy_2024 columns
+COLUMN_PATTERN = re.compile(r"^fy_(\d{4})$")
+LABEL_PATTERN = re.compile(r"FY\s*(\d{4}|\d{2})\s*=\s*([^,]+)", re.I)
+
+# Always present in hits and API items, so existing clients keep working
+DEFAULT_YEARS = (2024, 2023)
+
+
+def column(year: int) -> str:
+    return f"fy_{year}"
+
+
+def year_of(name: str):
+    """'fy_2024' -> 2024; None for anything that isn't a year column."""
+    match = COLUMN_PATTERN.match(name)
+    return int(match.group(1)) if match else None
+
+
+def year_columns(names) -> list:
+    """The fy_YYYY names among `names`, newest first."""
+    return sorted((n for n in names if year_of(n) is not None), key=year_of, reverse=True)
+
+
+def label(year: int) -> str:
+    return f"FY{year % 100:02d}"
+
+
+def parse_years(segment: str) -> dict:
+    """'FY24 = x, FY23 = y' -> {2024: x, 2023: y}; values that aren't numbers are left out."""
+    years = {}
+    for year, value in LABEL_PATTERN.findall(segment):
+        try:
+            years[int(year) if len(year) == 4 else 2000 + int(year)] = float(value)
+        except ValueError:
+            continue
+    return years
+
+
+def row_years(row: dict) -> dict:
+    """{year: value} from a row's fy_YYYY keys, skipping missing values."""
+    return {year_of(k): v for k, v in row.items() if year_of(k) is not None and v is not None}
+
+
+def year_fields(years: dict) -> dict:
+    """{year: value} -> {"fy_2024": value or None, ...}, newest first, with the DEFAULT_YEARS keys always set."""
+    fields = {}
+    for year in sorted(set(years) | set(DEFAULT_YEARS), reverse=True):
+        value = years.get(year)
+        fields[column(year)] = None if value is None or math.isnan(value) else float(value)
+    return fields
+
+
+def in_range(year: int, from_year: int = None, to_year: int = None) -> bool:
+    return (from_year is None or year >= from_year) and (to_year is None or year <= to_year)
@@ -1,38 +1,89 @@
+import asyncio
+import json
+import os
+import sys
+import time
 import typing
+from contextlib import asynccontextmanager
 from typing import List
-from kpi_fetch_doc_items import fetch_bs_items, fetch_pl_items, fetch_cf_items
-from get_kpi_on_doc_type import (
-    balance_sheet_kpis,
-    profit_and_loss_kpis,
-    cashflow_kpis,
-    cross_statement_kpis,
-)
 
 import strawberry
+from strawberry.dataloader import DataLoader
+from strawberry.extensions import SchemaExtension
+from strawberry.types import Info
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from strawberry.fastapi import GraphQLRouter
 from fastapi.middleware.cors import CORSMiddleware
 
 # --- Your existing utils ---
-from db_utils import get_financial_data
-from rag_query import run_rag_question
+from db_utils import aget_financial_data, close_pool
+import result_cache
+from vector_store import get_embedding_cache, index_version, is_loaded
+import rag_query
+from rag_query import answer_cache, astream_rag_question, run_rag_question
+from metrics import counter, render_prometheus, span, start_collecting, summarize
+from fiscal_years import in_range, year_columns, year_of
 # ---------- GraphQL Types ----------
 
-all_missing = []
+# Bounded per company/section/KPI counters; missing rate = missing / evaluations.
+# Both count sections served to clients, once per request and (company, section),
+# whether computed or taken from the result cache, so cache churn doesn't skew them.
+kpi_section_evaluations = counter(
+    "kpi_section_evaluations_total",
+    "KPI sections served (computed or cached), by company and section.",
+    labelnames=("company", "section"),
+)
+kpi_missing = counter(
+    "kpi_missing_total",
+    "KPIs served without a value (computed or cached), by company, section and KPI.",
+    labelnames=("company", "section", "kpi"),
+)
+
+
+# Same as kpi_registry.SECTIONS, which isn't imported here to keep server import cheap
+KPI_SECTIONS = ("balance_sheet", "pnl", "cashflow", "cross_statement")
+
+
+def _is_missing(v) -> bool:
+    # KPIs are (value, description); value None (or a None in a pair) means not computable
+    return v is None or v[0] is None or (isinstance(v[0], tuple) and None in v[0])
+
+
+def check_missing(kpis: dict, company: str, section: str) -> list:
+    """Names of the KPIs in this section without a value; also feeds the counters."""
+    missing = [k for k, v in kpis.items() if _is_missing(v)]
+    kpi_section_evaluations.inc(company=company, section=section)
+    for k in missing:
+        kpi_missing.inc(company=company, section=section, kpi=k)
+    return missing
+
+@strawberry.type
+class YearValue:
+    year: int
+    value: typing.Optional[float]
 
-def check_missing(kpis: dict, label: str):
-    missing = [k for k, v in kpis.items() if v is None]
-    if missing:
-        print(f"❌ {label} → Missing {len(missing)}: {missing}")
-        all_missing.extend([(label, k) for k in missing])
-    else:
-        print(f"✅ {label} → All good")
 
 @strawberry.type
 class FinancialItem:
     line_item: typing.Optional[str] = strawberry.field(name="line_item")
-    fy_2024: typing.Optional[float] = strawberry.field(name="fy_2024")
-    fy_2023: typing.Optional[float] = strawberry.field(name="fy_2023")
+    fy_2024: typing.Optional[float] = strawberry.field(name="fy_2024", default=None)
+    fy_2023: typing.Optional[float] = strawberry.field(name="fy_2023", default=None)
+    values: List[YearValue] = strawberry.field(default_factory=list)  # every year, newest first
+
+
+def financial_item(item: dict, from_year: int = None, to_year: int = None) -> FinancialItem:
+    """FinancialItem from a get_financial_data row; `values` limited to the year range."""
+    return FinancialItem(
+        line_item=item["line_item"],
+        fy_2024=item.get("fy_2024"),
+        fy_2023=item.get("fy_2023"),
+        values=[
+            YearValue(year=year_of(col), value=item[col])
+            for col in year_columns(item)
+            if in_range(year_of(col), from_year, to_year)
+        ],
+    )
 
 
 @strawberry.type
@@ -43,12 +94,220 @@ class KPI:
     description: str
 
 
+@strawberry.type
+class MissingKPI:
+    section: str
+    name: str
+
+
+@strawberry.type
+class KPICoverage:
+    total: int
+    missing_count: int
+    missing: List[MissingKPI]
+
+
+@strawberry.type
+class KPISeries:
+    name: str
+    description: str
+    values: List[YearValue]
+    yoy_growth: List[YearValue]  # amounts only; empty for ratios
+    cagr: typing.Optional[float]  # over the first and last year of the range that have a value
+
+
 @strawberry.type
 class CompanyMetrics:
-    balance_sheet: List[KPI]
-    pnl: List[KPI]
-    cashflow: List[KPI]
-    cross_statement: List[KPI]
+    """
+    Resolved lazily: each section is fetched and computed only if the query
+    selects it (see metrics_part_for).
+    """
+    company: strawberry.Private[str]
+
+    @strawberry.field
+    async def balance_sheet(self, info: Info) -> List[KPI]:
+        return dict_to_kpi_list(await metrics_part_for(info, self.company, "balance_sheet"))
+
+    @strawberry.field
+    async def pnl(self, info: Info) -> List[KPI]:
+        return dict_to_kpi_list(await metrics_part_for(info, self.company, "pnl"))
+
+    @strawberry.field
+    async def cashflow(self, info: Info) -> List[KPI]:
+        return dict_to_kpi_list(await metrics_part_for(info, self.company, "cashflow"))
+
+    @strawberry.field
+    async def cross_statement(self, info: Info) -> List[KPI]:
+        return dict_to_kpi_list(await metrics_part_for(info, self.company, "cross_statement"))
+
+    @strawberry.field
+    async def coverage(self, info: Info) -> KPICoverage:
+        # Coverage is reported per request instead of accumulated process-wide
+        sections = dict(zip(KPI_SECTIONS, await asyncio.gather(
+            *[metrics_part_for(info, self.company, section) for section in KPI_SECTIONS]
+        )))
+        missing = [
+            MissingKPI(section=section, name=name)
+            for section, kpis in sections.items()
+            for name, v in kpis.items()
+            if _is_missing(v)
+        ]
+        return KPICoverage(
+            total=sum(len(kpis) for kpis in sections.values()),
+            missing_count=len(missing),
+            missing=missing,
+        )
+
+    @strawberry.field
+    async def series(self, info: Info, from_year: typing.Optional[int] = None,
+                     to_year: typing.Optional[int] = None,
+                     names: typing.Optional[List[str]] = None) -> List[KPISeries]:
+        """KPIs for every fiscal year in [fromYear, toYear], with YoY growth and CAGR."""
+        from kpi_engine import SERIES, cagr, yoy_growth
+
+        years, data = await metrics_part_for(info, self.company, "series")
+        keep = [j for j, year in enumerate(years) if in_range(year, from_year, to_year)]
+        years = [years[j] for j in keep]
+        result = []
+        for name, (description, is_amount) in SERIES.items():
+            if name not in data or (names is not None and name not in names):
+                continue
+            values = data[name][keep][None, :]  # one company: (1, n_years)
+            result.append(KPISeries(
+                name=name,
+                description=description,
+                values=year_values(years, values[0]),
+                # the oldest year has no prior year to grow from
+                yoy_growth=year_values(years, yoy_growth(values, years)[0])[:-1] if is_amount else [],
+                cagr=_or_none(cagr(values, years)[0]) if is_amount else None,
+            ))
+        return result
+
+
+def _or_none(value):
+    return None if value != value else float(value)  # NaN -> None
+
+
+def year_values(years, values) -> List[YearValue]:
+    return [YearValue(year=year, value=_or_none(v)) for year, v in zip(years, values)]
+
+
+# ---------- Resolvers ----------
+
+# ✅ Convert dicts into list of KPI objects
+def dict_to_kpi_list(kpis: dict) -> List[KPI]:
+    return [
+        KPI(
+            name=k,
+            value=(str(v[0]) if not _is_missing(v) else None),
+            status=("ok" if not _is_missing(v) else "missing"),
+            description=(str(v[1]) if v is not None else None)
+        )
+        for k, v in kpis.items()
+    ]
+
+
+# Cross-request single flight: (event loop, cache key) -> task computing it
+_in_flight = {}
+
+
+async def _compute_and_store(cache_key, compute):
+    value = await compute()
+    result_cache.metrics_cache.set(cache_key, value)
+    return value
+
+
+async def _cached(company: str, part: str, compute, version=None):
+    # KPIs only change when the index does, so its content hash is part of the key
+    version = await (version if version is not None else asyncio.to_thread(index_version))
+    cache_key = ("company_metrics", version, company, part)
+    cached = result_cache.metrics_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    # Concurrent cold requests for the same key share one computation and one write
+    flight_key = (asyncio.get_running_loop(), cache_key)
+    task = _in_flight.get(flight_key)
+    if task is None:
+        task = asyncio.ensure_future(_compute_and_store(cache_key, compute))
+        _in_flight[flight_key] = task
+        task.add_done_callback(lambda _: _in_flight.pop(flight_key, None))
+    # A cancelled request must not cancel the computation other requests await
+    return await asyncio.shield(task)
+
+
+async def compute_section(company: str, section: str, loader: DataLoader = None, version=None) -> dict:
+    """
+    One KPI section as {name: (value, description)}. Only the line items
+    this section reads are looked up, through the request's DataLoader, so
+    items another section already loaded are not looked up again.
+    """
+    # The KPI modules pull in numpy/faiss; imported here to keep server import cheap
+    from kpi_fetch_doc_items import afetch_plan
+    from kpi_registry import as_dicts, compile_plan, hit_reader
+
+    async def compute():
+        plan = compile_plan(sections=[section])
+        hits = await afetch_plan(company, plan, loader)
+        with span("kpi.evaluate"):
+            return as_dicts(plan, plan.report(plan.evaluate(hit_reader(plan, hits))))[section]
+
+    kpis = await _cached(company, section, compute, version)
+    # Counted per section served (cached or not), so the rate follows the data
+    check_missing(kpis, company, section)
+    return kpis
+
+
+async def compute_series(company: str, loader: DataLoader = None, version=None):
+    """(years newest first, {series name: values per year}) over every year the statements have."""
+    from kpi_fetch_doc_items import afetch_plan
+    from kpi_engine import series_from_env, series_plan
+    from kpi_registry import hit_reader
+
+    async def compute():
+        plan = series_plan()
+        hits = await afetch_plan(company, plan, loader)
+        years = sorted({year_of(k) for hit in hits if hit for k in hit if year_of(k)}, reverse=True)
+        with span("kpi.evaluate"):
+            env = plan.evaluate(hit_reader(plan, hits, years), years)
+            return years, {name: values[0] for name, values in series_from_env(env).items()}
+
+    return await _cached(company, "series", compute, version)
+
+
+def metrics_part_for(info: Info, company: str, part: str):
+    """
+    Per-request memo: every field (including aliased duplicates) asking for
+    the same company's section or series awaits one shared computation, and
+    all line-item lookups go through the request's DataLoader.
+    """
+    memo = info.context["company_metrics"]
+    task = memo.get((company, part))
+    if task is None:
+        loader = info.context["line_items"]
+        # one index version lookup per request, shared by every section
+        version = memo.get("index_version")
+        if version is None:
+            version = memo["index_version"] = asyncio.ensure_future(asyncio.to_thread(index_version))
+        if part == "series":
+            task = asyncio.ensure_future(compute_series(company, loader, version))
+        else:
+            task = asyncio.ensure_future(compute_section(company, part, loader, version))
+        memo[(company, part)] = task
+    return task
+
+
+async def load_line_items(keys):
+    from KPIs_RAF_FSI.kpi_rag_retrieval import arag_lookup_batch  # faiss, loaded on first use
+
+    return await arag_lookup_batch(keys)
+
+
+async def get_context():
+    return {
+        # (company, statement_type, line_item) -> rag_lookup hit, batched and deduplicated
+        "line_items": DataLoader(load_fn=load_line_items),
+        "company_metrics": {},  # (company, section or "series") -> task, plus "index_version"
+    }
 
 
 # ---------- Root Query ----------
@@ -60,63 +319,53 @@ class Query:
         return run_rag_question(question)
 
     @strawberry.field
-    def get_financials(self, company: str, statementType: str) -> List[FinancialItem]:
-        data = get_financial_data(company, statementType)
-        return [FinancialItem(**item) for item in data]
+    async def get_financials(self, company: str, statementType: str,
+                             from_year: typing.Optional[int] = None,
+                             to_year: typing.Optional[int] = None) -> List[FinancialItem]:
+        data = await aget_financial_data(company, statementType)
+        return [financial_item(item, from_year, to_year) for item in data]
 
     @strawberry.field
     def company_metrics(self, company: str) -> CompanyMetrics:
-        print(company)
-
-        # --- Balance Sheet ---
-        bs_df = fetch_bs_items(company)
-        bs_kpis = balance_sheet_kpis(bs_df)  # dict: {name: value}
-        check_missing(bs_kpis, f"{company} Balance Sheet KPIs")
-
-        # --- P&L ---
-        pl_df = fetch_pl_items(company)
-        pl_kpis = profit_and_loss_kpis(pl_df)
-        check_missing(pl_kpis, f"{company} P&L KPIs")
-
-        # --- Cashflow ---
-        cf_df = fetch_cf_items(company)
-        cf_kpis = cashflow_kpis(cf_df)
-        check_missing(cf_kpis, f"{company} Cashflow KPIs")
-
-        # --- Cross Statement ---
-        x_kpis = cross_statement_kpis(bs_df, pl_df, cf_df)
-        check_missing(x_kpis, f"{company} Cross Statement KPIs")
-
-        if all_missing:
-            print(f"Total missing: {len(all_missing)}")
-            for label, metric in all_missing:
-                print(f" - {label}: {metric}")
-        else:
-            print("🎉 All KPIs present for all companies!")
-
-        # ✅ Convert dicts into list of KPI objects
-        def dict_to_kpi_list(kpis: dict) -> List[KPI]:
-            return [
-                KPI(
-                    name=k,
-                    value=(str(v[0]) if v is not None else None),
-                    status=("ok" if v is not None else "missing"),
-                    description=(str(v[1]) if v is not None else None)
-                )
-                for k, v in kpis.items()
-            ]
-
-        return CompanyMetrics(
-            balance_sheet=dict_to_kpi_list(bs_kpis),
-            pnl=dict_to_kpi_list(pl_kpis),
-            cashflow=dict_to_kpi_list(cf_kpis),
-            cross_statement=dict_to_kpi_list(x_kpis),
-        )
+        # Nothing is fetched until a section field is resolved
+        return CompanyMetrics(company=company)
+
+    @strawberry.field
+    def companies_metrics(self, companies: List[str]) -> List[CompanyMetrics]:
+        return [CompanyMetrics(company=c) for c in companies]
 
 
 # ---------- FastAPI Setup ----------
 
-app = FastAPI()
+def readiness() -> dict:
+    return {
+        "vectorstore": is_loaded(),
+        "qa_chain": rag_query.is_ready(),
+        "kpi_modules": "kpi_fetch_doc_items" in sys.modules,
+    }
+
+
+def warmup() -> dict:
+    """Load everything the first request would otherwise pay for."""
+    import kpi_fetch_doc_items  # noqa: F401  (KPI registry + retrieval pipeline)
+    from line_item_store import get_line_item_store
+
+    get_line_item_store()       # embeddings client, FAISS index, structured table
+    rag_query._current_chain()  # prompt, LLM client, RetrievalQA chain
+    return readiness()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Default is lazy (fast cold start); WARMUP_ON_STARTUP=1 loads before serving
+    if os.getenv("WARMUP_ON_STARTUP") == "1":
+        await asyncio.to_thread(warmup)
+    yield
+    # Release pooled Postgres connections on shutdown
+    close_pool()
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -130,6 +379,56 @@ app.add_middleware(
 def home():
     return {"message": "Welcome to RAG-FSI GraphQL API. Go to /graphql"}
 
-schema = strawberry.Schema(query=Query)
-graphql_router = GraphQLRouter(schema, graphiql=True)
+@app.get("/ready")
+def ready():
+    status = readiness()
+    return JSONResponse(status, status_code=200 if all(status.values()) else 503)
+
+@app.post("/warmup")
+async def warmup_endpoint():
+    return await asyncio.to_thread(warmup)
+
+@app.get("/ask/stream")
+async def ask_stream(question: str):
+    """askQuestion as Server-Sent Events: sources first, then tokens as generated."""
+    async def events():
+        async for event in astream_rag_question(question):
+            yield f"event: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+@app.get("/metrics")
+def metrics():
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
+
+@app.get("/cache/stats")
+def cache_stats():
+    embedding_cache = get_embedding_cache()
+    return {
+        "company_metrics": result_cache.metrics_cache.stats(),
+        "answers": answer_cache.stats(),
+        "embeddings": embedding_cache.stats() if embedding_cache is not None else None,
+    }
+
+class TimingExtension(SchemaExtension):
+    """Adds a per-request stage timing breakdown under extensions.timing."""
+
+    def on_operation(self):
+        self.spans = start_collecting()
+        self.start = time.perf_counter()
+        yield
+
+    def get_results(self):
+        return {
+            "timing": {
+                "total_seconds": time.perf_counter() - self.start,
+                "stages": summarize(self.spans),
+            }
+        }
+
+
+# GRAPHQL_TIMING=1 returns the breakdown with every response (stages always feed /metrics)
+extensions = [TimingExtension] if os.getenv("GRAPHQL_TIMING") == "1" else []
+schema = strawberry.Schema(query=Query, extensions=extensions)
+graphql_router = GraphQLRouter(schema, graphiql=True, context_getter=get_context)
 app.include_router(graphql_router, prefix="/graphql")
@@ -1,5 +1,14 @@
+from line_item_table import MISSING, LineItemTable
+
+
 def _need(df, key, col):
     """Strict access; raises clear error if missing."""
+    if isinstance(df, LineItemTable):
+        # dict lookup with an explicit sentinel, no exception on the way
+        val = df.get(key, col)
+        if val is MISSING:
+            raise KeyError(f"Missing required line_item '{key}' for {col}")
+        return val
     try:
         val = df.at[key, col]
     except KeyError as e:
@@ -10,6 +19,8 @@ def _need(df, key, col):
 
 def _opt(df, key, col, default=0.0):
     """Optional access; returns default if missing/None."""
+    if isinstance(df, LineItemTable):
+        return df.get(key, col, default)
     try:
         val = df.at[key, col]
         return default if val is None else float(val)
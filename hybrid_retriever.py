@@ -0,0 +1,137 @@
+"""
+Hybrid lexical + vector retrieval for askQuestion.
+
+Company and line-item names in chunks are exact tokens, which a BM25
+inverted index matches well and cheaply. HybridRetriever takes the top
+HYBRID_FETCH_K chunks from BM25 and from FAISS, fuses the two rankings
+with reciprocal-rank fusion (score = sum of 1 / (HYBRID_RRF_K + rank))
+and hands the best RETRIEVER_K chunks to the LLM. The BM25 index is built
+once over the docstore when the vector store is loaded.
+"""
+import asyncio
+import math
+import os
+import re
+from typing import Any
+import faiss
+import numpy as np
+from langchain_core.retrievers import BaseRetriever
+from metrics import span
+
+# Candidates taken from each ranker before fusion, and chunks passed on
+RETRIEVER_K = int(os.getenv("RETRIEVER_K", 5))
+HYBRID_FETCH_K = int(os.getenv("HYBRID_FETCH_K", 10))
+HYBRID_RRF_K = int(os.getenv("HYBRID_RRF_K", 60))
+
+_TOKEN = re.compile(r"[a-z][a-z0-9&]*")
+_FY_TOKEN = re.compile(r"fy\d+")
+
+
+def tokenize(text: str) -> list:
+    """Lowercased words; figures and FY labels are in every chunk, so they're left out."""
+    return [t for t in _TOKEN.findall(text.lower()) if not _FY_TOKEN.fullmatch(t)]
+
+
+class BM25Index:
+    """
+    Okapi BM25 over a list of texts (FAISS positions as doc ids). Each term's
+    postings store their length-normalised term weights, so a query is a
+    few vectorised adds into one score array.
+    """
+
+    def __init__(self, texts, k1: float = 1.2, b: float = 0.75):
+        docs = [tokenize(text) for text in texts]
+        self.size = len(docs)
+        lengths = np.array([len(d) for d in docs], dtype=np.float32)
+        avg = float(lengths.mean()) if self.size else 0.0
+        norm = k1 * (1 - b + b * lengths / avg) if avg else np.full(self.size, k1, dtype=np.float32)
+
+        postings = {}
+        for doc, tokens in enumerate(docs):
+            counts = {}
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            for token, tf in counts.items():
+                postings.setdefault(token, ([], []))
+                postings[token][0].append(doc)
+                postings[token][1].append(tf)
+
+        self.postings = {}
+        for token, (ids, tfs) in postings.items():
+            ids = np.array(ids, dtype=np.int64)
+            tfs = np.array(tfs, dtype=np.float32)
+            idf = math.log(1 + (self.size - len(ids) + 0.5) / (len(ids) + 0.5))
+            self.postings[token] = (ids, (idf * tfs * (k1 + 1) / (tfs + norm[ids])).astype(np.float32))
+
+    @classmethod
+    def from_vectorstore(cls, vectorstore):
+        """Index every chunk in FAISS position order."""
+        ids = vectorstore.index_to_docstore_id
+        return cls(
+            getattr(vectorstore.docstore.search(ids[pos]), "page_content", "")
+            for pos in range(vectorstore.index.ntotal)
+        )
+
+    def search(self, query: str, k: int) -> list:
+        """Positions of the k best-scoring texts that share a term with the query."""
+        terms = [self.postings[t] for t in set(tokenize(query)) if t in self.postings]
+        if not terms or k <= 0:
+            return []
+        scores = np.zeros(self.size, dtype=np.float32)
+        for ids, weights in terms:
+            scores[ids] += weights  # ids are unique within a posting list
+        k = min(k, int(np.count_nonzero(scores)))
+        top = np.argpartition(-scores, k - 1)[:k]
+        return top[np.argsort(-scores[top], kind="stable")].tolist()
+
+
+def reciprocal_rank_fusion(rankings, k: int = HYBRID_RRF_K) -> list:
+    """Ids ordered by sum of 1 / (k + rank) over the rankings (rank from 1)."""
+    scores = {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking, start=1):
+            scores[doc] = scores.get(doc, 0.0) + 1.0 / (k + rank)
+    return sorted(scores, key=lambda doc: -scores[doc])
+
+
+class HybridRetriever(BaseRetriever):
+    """BM25 + FAISS candidates, fused by reciprocal rank; see the module docstring."""
+
+    vectorstore: Any
+    bm25: Any
+    k: int = RETRIEVER_K
+    fetch_k: int = HYBRID_FETCH_K
+    rrf_k: int = HYBRID_RRF_K
+
+    @classmethod
+    def from_vectorstore(cls, vectorstore, **kwargs):
+        with span("bm25_build"):
+            bm25 = BM25Index.from_vectorstore(vectorstore)
+        return cls(vectorstore=vectorstore, bm25=bm25, **kwargs)
+
+    def _vector_ranking(self, vector) -> list:
+        vectors = np.array([vector], dtype=np.float32)
+        if self.vectorstore._normalize_L2:
+            faiss.normalize_L2(vectors)
+        with span("faiss_search"):
+            _, indices = self.vectorstore.index.search(vectors, self.fetch_k)
+        return [int(i) for i in indices[0] if i != -1]
+
+    def _fuse(self, query: str, vector) -> list:
+        with span("bm25_search"):
+            lexical = self.bm25.search(query, self.fetch_k)
+        positions = reciprocal_rank_fusion([lexical, self._vector_ranking(vector)], self.rrf_k)[:self.k]
+        ids = self.vectorstore.index_to_docstore_id
+        with span("docstore"):
+            return [self.vectorstore.docstore.search(ids[pos]) for pos in positions]
+
+    def _get_relevant_documents(self, query: str, *, run_manager) -> list:
+        with span("embedding"):
+            vector = self.vectorstore.embeddings.embed_query(query)
+        return self._fuse(query, vector)
+
+    async def _aget_relevant_documents(self, query: str, *, run_manager) -> list:
+        with span("embedding"):
+            vector = await self.vectorstore.embeddings.aembed_query(query)
+        # Searches are blocking; keep them off the event loop
+        return await asyncio.to_thread(self._fuse, query, vector)
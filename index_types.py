@@ -0,0 +1,69 @@
+import math
+import os
+import faiss
+import numpy as np
+
+# Index layouts build_index.py / compact_index.py can serve from
+INDEX_TYPES = ("flat", "ivf_flat", "hnsw", "ivf_pq")
+
+FAISS_INDEX_TYPE = os.getenv("FAISS_INDEX_TYPE", "flat")
+FAISS_PCA_DIM = int(os.getenv("FAISS_PCA_DIM", 0))          # 0 = keep full dimension
+FAISS_NPROBE = int(os.getenv("FAISS_NPROBE", 16))            # IVF lists scanned per query
+FAISS_EF_SEARCH = int(os.getenv("FAISS_EF_SEARCH", 64))      # HNSW candidate list size
+HNSW_M = 32
+
+
+def _nlist(n: int) -> int:
+    # ~4 * sqrt(n) lists, but at least 39 training points per list
+    return max(1, min(int(4 * math.sqrt(n)), n // 39))
+
+
+def factory_spec(index_type: str, d: int, n: int, pca_dim: int = 0) -> str:
+    """faiss.index_factory string for an index type over n vectors of dimension d."""
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type {index_type!r}; expected one of {', '.join(INDEX_TYPES)}")
+    prefix = ""
+    if pca_dim:
+        if pca_dim >= d:
+            raise ValueError(f"PCA dimension {pca_dim} must be below the vector dimension {d}")
+        prefix, d = f"PCA{pca_dim},", pca_dim
+    if index_type == "flat":
+        body = "Flat"
+    elif index_type == "ivf_flat":
+        body = f"IVF{_nlist(n)},Flat"
+    elif index_type == "hnsw":
+        body = f"HNSW{HNSW_M}"
+    else:
+        # 16 dims per sub-quantizer: 1536 -> 96 bytes a vector, 256 -> 16
+        m = max(1, d // 16)
+        while d % m:
+            m -= 1
+        body = f"IVF{_nlist(n)},PQ{m}"
+    return prefix + body
+
+
+def build(vectors, index_type: str = "flat", pca_dim: int = 0, metric=faiss.METRIC_L2):
+    """Train (if needed) and fill an index of the given type; positions follow `vectors`."""
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    n, d = vectors.shape
+    index = faiss.index_factory(d, factory_spec(index_type, d, n, pca_dim), metric)
+    if not index.is_trained:
+        index.train(vectors)
+    index.add(vectors)
+    return index
+
+
+def configure(index, nprobe: int = FAISS_NPROBE, ef_search: int = FAISS_EF_SEARCH):
+    """
+    Query-time settings for a loaded index. IVF indexes also get a direct
+    map so vectors can be reconstructed by position (partition sub-indexes,
+    MMR re-ranking).
+    """
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf.nprobe = min(nprobe, ivf.nlist)
+        ivf.make_direct_map()
+    hnsw = faiss.downcast_index(index.index) if isinstance(index, faiss.IndexPreTransform) else index
+    if isinstance(hnsw, faiss.IndexHNSW):
+        hnsw.hnsw.efSearch = ef_search
+    return index
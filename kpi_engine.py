@@ -0,0 +1,194 @@
+import numpy as np
+import pandas as pd
+from fiscal_years import column, year_columns, year_of
+from kpi_registry import SECTIONS, compile_plan, cube_reader, ratio
+from line_item_table import LineItemTable
+
+# The formulas live in kpi_registry; this module evaluates them for many
+# companies at once. Named KPIs (current_ratio_2024, ...) cover the years
+# their definitions list; kpi_series covers every year of the cube.
+YEAR_COLUMNS = ["fy_2024", "fy_2023"]
+
+
+def stack_frames(frames: dict) -> pd.DataFrame:
+    """
+    {company: table or (bs, pl, cf) tables} -> one frame indexed by
+    (company, line_item) with every fy_* column, ready for batch_kpis.
+    Tables are what the fetchers return (LineItemTables, e.g. from
+    fetch_all_items) or frames indexed by line_item. To fetch many
+    companies at once, kpi_fetch_doc_items.fetch_stacked_items builds
+    this frame from one batched lookup.
+    """
+    parts = {}
+    for company, dfs in frames.items():
+        if isinstance(dfs, (pd.DataFrame, LineItemTable)):
+            dfs = (dfs,)
+        dfs = [df.to_pandas() if isinstance(df, LineItemTable) else df for df in dfs]
+        parts[company] = pd.concat([df[year_columns(df.columns)] for df in dfs])
+    stacked = pd.concat(parts, names=["company", "line_item"])
+    return stacked[year_columns(stacked.columns)]
+
+
+class LineItemCube:
+    """(company x line item x year) float64 values; NaN marks a missing value."""
+
+    def __init__(self, companies, values: dict, years=YEAR_COLUMNS):
+        self.companies = list(companies)
+        self.years = list(years)  # fy_* column names, newest first
+        self.values = values  # line_item -> array of shape (n_companies, n_years)
+
+    @classmethod
+    def from_frame(cls, frame: pd.DataFrame, years=None):
+        """`years` defaults to every fy_* column of the frame; absent ones are all-NaN."""
+        years = year_columns(frame.columns) if years is None else list(years)
+        frame = frame[~frame.index.duplicated()].reindex(columns=years)
+        companies = frame.index.get_level_values(0).unique()
+        # (companies x line items x years) in one reshape of the long frame
+        wide = frame.astype(float).unstack("line_item").reindex(companies)
+        items = wide.columns.get_level_values("line_item").unique()
+        wide = wide.reindex(columns=pd.MultiIndex.from_product([years, items]))
+        cube = wide.to_numpy(dtype=np.float64).reshape(len(companies), len(years), len(items))
+        values = {item: cube[:, :, j] for j, item in enumerate(items)}
+        return cls(companies, values, years)
+
+    def select(self, years):
+        """Cube restricted to (and ordered by) `years`; years it doesn't have are all-NaN."""
+        missing = np.full(len(self.companies), np.nan)
+        cols = [self.years.index(y) if y in self.years else None for y in years]
+        values = {
+            item: np.stack([arr[:, c] if c is not None else missing for c in cols], axis=-1)
+            for item, arr in self.values.items()
+        }
+        return LineItemCube(self.companies, values, years)
+
+    def need(self, item):
+        """Required item; all-NaN when absent (the scalar path would raise)."""
+        arr = self.values.get(item)
+        if arr is None:
+            return np.full((len(self.companies), len(self.years)), np.nan)
+        return arr
+
+    def opt(self, item, default=np.nan):
+        """Optional item; missing values replaced by `default`."""
+        arr = self.need(item)
+        return arr if np.isnan(default) else np.where(np.isnan(arr), default, arr)
+
+
+def _frame(cube, columns: dict) -> pd.DataFrame:
+    df = pd.DataFrame(columns, index=pd.Index(cube.companies, name="company"))
+    return df.round(3)  # same rounding as the scalar KPI functions
+
+
+def section_kpis(cube: LineItemCube, sections=SECTIONS) -> dict:
+    """{section: DataFrame(company x KPI)} from the kpi_registry formulas, every company at once."""
+    plan = compile_plan(sections=sections)
+    cube = cube.select([column(year) for year in plan.years])
+    report = plan.report(plan.evaluate(cube_reader(cube)), split_pairs=True)
+    return {section: _frame(cube, report.get(section, {})) for section in sections}
+
+
+def balance_sheet_kpis(cube: LineItemCube) -> pd.DataFrame:
+    return section_kpis(cube, ["balance_sheet"])["balance_sheet"]
+
+
+def profit_and_loss_kpis(cube: LineItemCube) -> pd.DataFrame:
+    return section_kpis(cube, ["pnl"])["pnl"]
+
+
+def cashflow_kpis(cube: LineItemCube) -> pd.DataFrame:
+    return section_kpis(cube, ["cashflow"])["cashflow"]
+
+
+def cross_statement_kpis(cube: LineItemCube) -> pd.DataFrame:
+    return section_kpis(cube, ["cross_statement"])["cross_statement"]
+
+
+def batch_kpis(data) -> dict:
+    """
+    Every KPI for many companies in one column-wise pass.
+    `data` is a (company, line_item) stacked frame or a LineItemCube.
+    Returns {section: DataFrame(company x KPI)} with NaN where the scalar
+    functions give None.
+    """
+    cube = data if isinstance(data, LineItemCube) else LineItemCube.from_frame(data)
+    return section_kpis(cube)
+
+
+# ---------------- Multi-year series ----------------
+# kpi_registry input/formula name -> (description, whether it is an amount, so growth rates make sense)
+SERIES = {
+    "revenue": ("Revenue from operations (Total income where it's missing)", True),
+    "net_profit": ("Profit for the year", True),
+    "operating_cash_flow": ("Net cash from operating activities", True),
+    "free_cash_flow": ("CFO + capex (capex is negative)", True),
+    "total_assets": ("Total Assets", True),
+    "total_equity": ("Total Equity", True),
+    "current_ratio": ("Current Assets / Current Liabilities", False),
+    "quick_ratio": ("(Current Assets - Inventories) / Current Liabilities", False),
+    "debt_to_equity": ("Total Liabilities / Total Equity", False),
+    "net_profit_margin": ("Profit for the year / Revenue", False),
+    "pbt_margin": ("Profit before tax / Revenue", False),
+    "roe": ("Profit for the year / Total Equity", False),
+    "roa": ("Profit for the year / Total Assets", False),
+    "cash_conversion": ("CFO / Profit for the year", False),
+}
+
+
+def series_from_env(env: dict) -> dict:
+    """The SERIES values out of an evaluated kpi_registry plan (see series_plan)."""
+    return {name: np.round(env[name], 3) for name in SERIES}
+
+
+def series_plan():
+    return compile_plan(inputs=list(SERIES))
+
+
+def kpi_series(cube: LineItemCube) -> dict:
+    """
+    Every SERIES KPI for every company and every year of the cube in one
+    pass: {name: array (n_companies, n_years)}, years as in cube.years.
+    """
+    env = series_plan().evaluate(cube_reader(cube), [year_of(y) for y in cube.years])
+    return series_from_env(env)
+
+
+def yoy_growth(values, years):
+    """
+    Growth on the prior year for (n, n_years) values with years newest
+    first: column j compares years[j] with years[j + 1]. NaN where that year
+    isn't the one right before (a gap) and in the oldest column.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    out = np.full(values.shape, np.nan)
+    if values.shape[-1] > 1:
+        numbers = np.array([year_of(y) if isinstance(y, str) else y for y in years])
+        adjacent = (numbers[:-1] - numbers[1:]) == 1
+        prior = values[:, 1:]
+        out[:, :-1] = np.where(adjacent, ratio(values[:, :-1] - prior, prior), np.nan)
+    return np.round(out, 3)
+
+
+def cagr(values, years):
+    """
+    Compound annual growth per row between its newest and oldest available
+    year; NaN when fewer than two years are available or either end isn't positive.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if values.shape[-1] == 0:
+        return np.full(values.shape[0], np.nan)
+    numbers = np.array([year_of(y) if isinstance(y, str) else y for y in years], dtype=np.float64)
+    rows = np.arange(values.shape[0])
+    available = ~np.isnan(values)
+    newest = np.argmax(available, axis=1)
+    oldest = values.shape[1] - 1 - np.argmax(available[:, ::-1], axis=1)
+    start, end = values[rows, oldest], values[rows, newest]
+    span = numbers[newest] - numbers[oldest]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out = np.power(end / start, 1.0 / span) - 1
+    ok = available.any(axis=1) & (span > 0) & (start > 0) & (end > 0)
+    return np.round(np.where(ok, out, np.nan), 3)
+
+
+def to_records(df: pd.DataFrame) -> dict:
+    """{company: {kpi: value or None}} for API responses."""
+    return df.astype(object).where(df.notna(), None).to_dict(orient="index")
@@ -1,51 +1,118 @@
 import pandas as pd
-from KPIs_RAF_FSI.kpi_rag_retrieval import rag_lookup
-
-def _fetch_required(company: str, statement_type: str, items: list[str]) -> pd.DataFrame:
-    rows = []
-    for q in items:
-        hit = rag_lookup(company, statement_type, q)
-        if hit:  # keep your canonical name even if source phrasing differs
-            rows.append(hit)
-    if not rows:
-        # Return an empty frame with expected schema so downstream doesn't crash
-        return pd.DataFrame(columns=["line_item", "fy_2024", "fy_2023"]).set_index("line_item")
-    return pd.DataFrame(rows).set_index("line_item")
-
-# Balance Sheet
-def fetch_bs_items(company: str) -> pd.DataFrame:
-    required = [
-        "Total Current Assets",
-        "Total Current Liabilities",
-        "Inventories",
-        "Total Liabilities",
-        "Total Equity",
-        "Total Assets",
-        # Optional extras you might want:
-        # "Trade receivables", "Cash and cash equivalents"
+from metrics import timed
+from line_item_table import LineItemTable
+from kpi_registry import as_dicts, compile_plan, hit_reader, statement_items
+from KPIs_RAF_FSI.kpi_rag_retrieval import arag_lookup_batch, rag_lookup_batch
+
+# Every line item a KPI in kpi_registry reads, per statement. Use
+# fetch_kpis to retrieve only what a given set of KPIs needs.
+BS_ITEMS = statement_items("balance_sheet")
+PL_ITEMS = statement_items("profit_and_loss")
+CF_ITEMS = statement_items("cash_flows")
+
+
+def _to_table(hits) -> LineItemTable:
+    # Rows keep the canonical line item name even if the source phrasing
+    # differs; an empty table still has the fy columns, so downstream doesn't crash
+    return LineItemTable.from_hits(hits)
+
+
+@timed("fetch_required")
+def _fetch_required(company: str, statement_type: str, items: list[str]) -> LineItemTable:
+    hits = rag_lookup_batch([(company, statement_type, q) for q in items])
+    return _to_table(hits)
+
+
+def fetch_bs_items(company: str) -> LineItemTable:
+    return _fetch_required(company, "balance_sheet", BS_ITEMS)
+
+
+def fetch_pl_items(company: str) -> LineItemTable:
+    return _fetch_required(company, "profit_and_loss", PL_ITEMS)
+
+
+def fetch_cf_items(company: str) -> LineItemTable:
+    return _fetch_required(company, "cash_flows", CF_ITEMS)
+
+
+def fetch_all_items(company: str):
+    """Balance sheet, P&L and cashflow tables from a single batched lookup."""
+    statements = [
+        ("balance_sheet", BS_ITEMS),
+        ("profit_and_loss", PL_ITEMS),
+        ("cash_flows", CF_ITEMS),
     ]
-    return _fetch_required(company, "balance_sheet", required)
-
-# Profit & Loss
-def fetch_pl_items(company: str) -> pd.DataFrame:
-    required = [
-        "Revenue from operations",     # fallback: "Total income"
-        "Total income",
-        "Total expenses",
-        "Profit before tax",
-        "Profit for the year",
-        "Finance costs",
-        "Depreciation and amortization",
+    lookups = [(company, st, q) for st, items in statements for q in items]
+    hits = rag_lookup_batch(lookups)
+
+    tables, start = [], 0
+    for _, items in statements:
+        tables.append(_to_table(hits[start:start + len(items)]))
+        start += len(items)
+    return tuple(tables)
+
+
+def fetch_stacked_items(companies: list[str]) -> pd.DataFrame:
+    """
+    All three statements for many companies in one batched lookup, stacked
+    into a (company, line_item) frame for kpi_engine.batch_kpis.
+    """
+    statements = [
+        ("balance_sheet", BS_ITEMS),
+        ("profit_and_loss", PL_ITEMS),
+        ("cash_flows", CF_ITEMS),
     ]
-    return _fetch_required(company, "profit_and_loss", required)
-
-# Cashflow
-def fetch_cf_items(company: str) -> pd.DataFrame:
-    required = [
-        "Net cash from operating activities",
-        "Net cash from investing activities",
-        "Net cash from financing activities",
-        "Purchase of property, plant and equipment",   # Capex proxy (usually negative)
-        "Dividends paid",
+    lookups = [(c, st, q) for c in companies for st, items in statements for q in items]
+    hits = rag_lookup_batch(lookups)
+    rows = [
+        {"company": company, **hit}
+        for (company, _, _), hit in zip(lookups, hits)
+        if hit
     ]
-    return _fetch_required(company, "cash_flows", required)
+    if not rows:
+        return pd.DataFrame(columns=["company", "line_item", "fy_2024", "fy_2023"]).set_index(["company", "line_item"])
+    return pd.DataFrame(rows).set_index(["company", "line_item"])
+
+
+@timed("fetch_required")
+def fetch_plan(company: str, plan) -> list:
+    """rag_lookup hits for each line item of a kpi_registry Plan, in one batch."""
+    return rag_lookup_batch(plan.lookups(company))
+
+
+def fetch_kpis(company: str, kpis=None, sections=None, digits=3, describe: bool = True) -> dict:
+    """
+    KPIs for one company, fetching only the line items they read, each once.
+    Returns {section: {name: (value, description)}} (see kpi_registry.as_dicts).
+    """
+    plan = compile_plan(kpis, sections)
+    env = plan.evaluate(hit_reader(plan, fetch_plan(company, plan)))
+    return as_dicts(plan, plan.report(env), digits=digits, describe=describe)
+
+
+# ---------- Async variants (used by the GraphQL resolvers) ----------
+
+@timed("fetch_required")
+async def _afetch_required(company: str, statement_type: str, items: list[str], loader=None) -> LineItemTable:
+    keys = [(company, statement_type, q) for q in items]
+    # A request-scoped DataLoader batches and deduplicates lookups across fields
+    hits = await (loader.load_many(keys) if loader is not None else arag_lookup_batch(keys))
+    return _to_table(hits)
+
+
+async def afetch_bs_items(company: str, loader=None) -> LineItemTable:
+    return await _afetch_required(company, "balance_sheet", BS_ITEMS, loader)
+
+
+async def afetch_pl_items(company: str, loader=None) -> LineItemTable:
+    return await _afetch_required(company, "profit_and_loss", PL_ITEMS, loader)
+
+
+async def afetch_cf_items(company: str, loader=None) -> LineItemTable:
+    return await _afetch_required(company, "cash_flows", CF_ITEMS, loader)
+
+
+@timed("fetch_required")
+async def afetch_plan(company: str, plan, loader=None) -> list:
+    keys = plan.lookups(company)
+    return await (loader.load_many(keys) if loader is not None else arag_lookup_batch(keys))
@@ -0,0 +1,451 @@
+"""
+Declarative KPI definitions.
+
+Every KPI is a formula over named inputs; an input is a statement line item
+or another formula. compile_plan() turns the KPIs a caller asks for into a
+Plan: the minimal set of line items to fetch (each once) and the formulas
+to evaluate, in dependency order. Values are float64 arrays of shape
+(n_companies, n_years), NaN where missing, so one plan serves a single
+company (get_kpi_on_doc_type, GraphQL) and the batch path (kpi_engine).
+"""
+import functools
+import math
+import numpy as np
+from fiscal_years import column
+from line_item_table import LineItemTable
+
+# Years of the named KPIs the API has always returned (current_ratio_2024, ...)
+CURRENT_YEAR = 2024
+PRIOR_YEAR = 2023
+BOTH_YEARS = (CURRENT_YEAR, PRIOR_YEAR)
+
+SECTIONS = ("balance_sheet", "pnl", "cashflow", "cross_statement")
+
+
+class LineItem:
+    """Input read from a statement. Missing values are NaN unless a default is given."""
+
+    def __init__(self, name, statement_type, line_item, default=np.nan):
+        self.name = name
+        self.statement_type = statement_type
+        self.line_item = line_item
+        self.default = default
+        self.inputs = ()
+
+
+class Formula:
+    """Input computed as formula(*inputs); "name@prior" is that input one year earlier."""
+
+    def __init__(self, name, formula, inputs):
+        self.name = name
+        self.formula = formula
+        self.inputs = tuple(inputs)
+
+
+class KPI(Formula):
+    """
+    Reported value. `name` and `description` may contain {year}; the KPI is
+    then reported once per year in `years`. Formulas returning a pair are
+    reported as a tuple, or as one column per `parts` name in frames.
+    """
+
+    def __init__(self, name, section, formula, inputs, description, years=(CURRENT_YEAR,), parts=None):
+        super().__init__(name, formula, inputs)
+        self.section = section
+        self.description = description
+        self.years = tuple(years)
+        self.parts = parts
+
+    @property
+    def key(self):
+        return f"{self.section}.{self.name}"
+
+    def outputs(self):
+        """(output name, year) per reported year."""
+        return [(self.name.format(year=year), year) for year in self.years]
+
+    def describe(self, year):
+        return self.description.format(year=f"FY{year}")
+
+
+# ---------- Formulas ----------
+
+def ratio(num, den):
+    """num / den with NaN where den is 0 or missing (scalar `x / d if d else None`)."""
+    out = np.full(np.broadcast(num, den).shape, np.nan)
+    return np.divide(num, den, out=out, where=den != 0)
+
+
+def growth(current, prior):
+    return ratio(current - prior, prior)
+
+
+def first_available(value, fallback):
+    return np.where(np.isnan(value), fallback, value)
+
+
+def same(value):
+    return value
+
+
+def pair(a, b):
+    return a, b
+
+
+# ---------- Registry ----------
+
+INPUTS = [
+    # Balance sheet
+    LineItem("current_assets", "balance_sheet", "Total Current Assets"),
+    LineItem("current_liabilities", "balance_sheet", "Total Current Liabilities"),
+    LineItem("inventories", "balance_sheet", "Inventories", default=0.0),
+    LineItem("total_liabilities", "balance_sheet", "Total Liabilities"),
+    LineItem("total_equity", "balance_sheet", "Total Equity"),
+    LineItem("total_assets", "balance_sheet", "Total Assets"),
+    LineItem("trade_receivables", "balance_sheet", "Trade receivables"),
+    # Profit & loss
+    LineItem("revenue_from_operations", "profit_and_loss", "Revenue from operations"),
+    LineItem("total_income", "profit_and_loss", "Total income"),
+    LineItem("profit_before_tax", "profit_and_loss", "Profit before tax"),
+    LineItem("net_profit", "profit_and_loss", "Profit for the year"),
+    LineItem("finance_costs", "profit_and_loss", "Finance costs", default=0.0),
+    LineItem("depreciation", "profit_and_loss", "Depreciation and amortization", default=0.0),
+    # Cash flows
+    LineItem("operating_cash_flow", "cash_flows", "Net cash from operating activities"),
+    LineItem("investing_cash_flow", "cash_flows", "Net cash from investing activities"),
+    LineItem("financing_cash_flow", "cash_flows", "Net cash from financing activities"),
+    LineItem("capex", "cash_flows", "Purchase of property, plant and equipment", default=0.0),  # usually negative
+    LineItem("dividends", "cash_flows", "Dividends paid", default=0.0),
+]
+
+FORMULAS = [
+    # Prefer Revenue from operations; fall back to Total income
+    Formula("revenue", first_available, ["revenue_from_operations", "total_income"]),
+    Formula("equity_plus_liabilities", np.add, ["total_equity", "total_liabilities"]),
+    Formula("free_cash_flow", np.add, ["operating_cash_flow", "capex"]),
+    Formula("cash_flow_total", lambda o, i, f: np.abs(o) + np.abs(i) + np.abs(f),
+            ["operating_cash_flow", "investing_cash_flow", "financing_cash_flow"]),
+    Formula("current_ratio", ratio, ["current_assets", "current_liabilities"]),
+    Formula("quick_ratio", lambda ca, inv, cl: ratio(ca - inv, cl), ["current_assets", "inventories", "current_liabilities"]),
+    Formula("debt_to_equity", ratio, ["total_liabilities", "total_equity"]),
+    Formula("net_profit_margin", ratio, ["net_profit", "revenue"]),
+    Formula("pbt_margin", ratio, ["profit_before_tax", "revenue"]),
+    Formula("roe", ratio, ["net_profit", "total_equity"]),
+    Formula("roa", ratio, ["net_profit", "total_assets"]),
+    Formula("cash_conversion", ratio, ["operating_cash_flow", "net_profit"]),
+]
+
+KPIS = [
+    # ---------------- Balance Sheet ----------------
+    KPI("current_ratio_{year}", "balance_sheet", same, ["current_ratio"],
+        "Liquidity ratio: current assets ÷ current liabilities ({year}).", BOTH_YEARS),
+    KPI("quick_ratio_{year}", "balance_sheet", same, ["quick_ratio"],
+        "Acid-test: (current assets – inventories) ÷ current liabilities ({year}).", BOTH_YEARS),
+    KPI("debt_to_equity_{year}", "balance_sheet", same, ["debt_to_equity"],
+        "Leverage: total liabilities ÷ equity ({year}).", BOTH_YEARS),
+    KPI("assets_vs_equity_liab_{year}", "balance_sheet", pair, ["total_assets", "equity_plus_liabilities"],
+        "Check: assets should equal liabilities + equity ({year}).", BOTH_YEARS,
+        parts=("total_assets_{year}", "equity_plus_liabilities_{year}")),
+
+    # ---------------- Profit & Loss ----------------
+    KPI("net_profit_margin_{year}", "pnl", same, ["net_profit_margin"],
+        "Net margin: profit after tax ÷ revenue ({year}).", BOTH_YEARS),
+    KPI("pbt_margin_{year}", "pnl", same, ["pbt_margin"],
+        "Profit before tax ÷ revenue ({year}).", BOTH_YEARS),
+    KPI("revenue_yoy_growth", "pnl", growth, ["revenue", "revenue@prior"],
+        "Year-over-year growth in revenue."),
+    KPI("net_profit_yoy_growth", "pnl", growth, ["net_profit", "net_profit@prior"],
+        "Year-over-year growth in net profit."),
+    KPI("finance_cost_{year}", "pnl", same, ["finance_costs"],
+        "Finance costs (interest and related expenses, {year}).", BOTH_YEARS),
+    KPI("depreciation_{year}", "pnl", same, ["depreciation"],
+        "Depreciation and amortization expense ({year}).", BOTH_YEARS),
+
+    # ---------------- Cash Flow ----------------
+    KPI("cfo_{year}", "cashflow", same, ["operating_cash_flow"],
+        "Operating cash flow (cash from core operations, {year}).", BOTH_YEARS),
+    KPI("cfi_{year}", "cashflow", same, ["investing_cash_flow"],
+        "Investing cash flow (capital expenditure, acquisitions, {year}).", BOTH_YEARS),
+    KPI("cff_{year}", "cashflow", same, ["financing_cash_flow"],
+        "Financing cash flow (debt, equity, dividends, {year}).", BOTH_YEARS),
+    KPI("free_cash_flow_{year}", "cashflow", same, ["free_cash_flow"],
+        "Free cash flow: operating cash – capital expenditure ({year}).", BOTH_YEARS),
+    KPI("dividends_{year}", "cashflow", same, ["dividends"],
+        "Dividends paid to shareholders ({year}).", BOTH_YEARS),
+    KPI("cfo_mix_{year}", "cashflow", ratio, ["operating_cash_flow", "cash_flow_total"],
+        "Share of operating cash in total cash flow mix ({year})."),
+    KPI("cfi_mix_{year}", "cashflow", ratio, ["investing_cash_flow", "cash_flow_total"],
+        "Share of investing cash in total cash flow mix ({year})."),
+    KPI("cff_mix_{year}", "cashflow", ratio, ["financing_cash_flow", "cash_flow_total"],
+        "Share of financing cash in total cash flow mix ({year})."),
+
+    # ---------------- Cross-Statement ----------------
+    KPI("roe_{year}", "cross_statement", same, ["roe"],
+        "Return on equity: net profit ÷ equity ({year})."),
+    KPI("roa_{year}", "cross_statement", same, ["roa"],
+        "Return on assets: net profit ÷ assets ({year})."),
+    KPI("cash_conversion_{year}", "cross_statement", same, ["cash_conversion"],
+        "Cash conversion: operating cash ÷ net profit ({year})."),
+    KPI("receivables_as_pct_of_revenue_{year}", "cross_statement", ratio, ["trade_receivables", "revenue"],
+        "Receivables as % of revenue (working capital efficiency, {year})."),
+    KPI("receivables_yoy_growth", "cross_statement", growth, ["trade_receivables", "trade_receivables@prior"],
+        "Year-over-year growth in trade receivables."),
+    KPI("revenue_yoy_growth", "cross_statement", growth, ["revenue", "revenue@prior"],
+        "Year-over-year growth in revenue."),
+]
+
+DEFINITIONS = {node.name: node for node in INPUTS + FORMULAS}
+
+
+def statement_items(statement_type: str) -> list:
+    """Every line item the registry reads from one statement, in registry order."""
+    return [node.line_item for node in INPUTS if node.statement_type == statement_type]
+
+
+# ---------- Plans ----------
+
+class Plan:
+    """Line items to fetch and formulas to evaluate for a set of KPIs (and/or inputs)."""
+
+    def __init__(self, kpis, steps, years):
+        self.kpis = kpis
+        self.steps = steps  # LineItems then Formulas/KPIs, each after its inputs
+        self.line_items = [s for s in steps if isinstance(s, LineItem)]
+        self.years = years  # years the KPIs need values for, newest first
+        self._descriptions = None
+
+    def lookups(self, company: str) -> list:
+        """(company, statement_type, line_item) per line item, in self.line_items order."""
+        return [(company, item.statement_type, item.line_item) for item in self.line_items]
+
+    def evaluate(self, read, years=None) -> dict:
+        """
+        Run the plan. read(line_item) gives a LineItem's values as an
+        (n_companies, len(years)) array. Returns {name: values} for every
+        step (KPIs under KPI.key).
+        """
+        years = list(self.years if years is None else years)
+        # column of the year before each year; -1 picks the NaN padding column
+        prior = [years.index(y - 1) if y - 1 in years else -1 for y in years]
+        env = {}
+        for step in self.steps:
+            if isinstance(step, LineItem):
+                values = np.asarray(read(step), dtype=np.float64)
+                if not math.isnan(step.default):
+                    values = np.where(np.isnan(values), step.default, values)
+                env[step.name] = values
+            else:
+                args = [_resolve(env, ref, prior) for ref in step.inputs]
+                env[step.key if isinstance(step, KPI) else step.name] = step.formula(*args)
+        return env
+
+    def report(self, env: dict, years=None, split_pairs: bool = False) -> dict:
+        """
+        {section: {output name: values (n_companies,) or a pair of them}};
+        split_pairs reports a pair as one entry per KPI.parts name instead.
+        """
+        years = list(self.years if years is None else years)
+        sections = {}
+        for kpi in self.kpis:
+            out = sections.setdefault(kpi.section, {})
+            values = env[kpi.key]
+            for name, year in kpi.outputs():
+                if year in years:
+                    at = lambda a: a[:, years.index(year)]
+                else:
+                    at = lambda a: np.full(len(a), np.nan)
+                if not isinstance(values, tuple):
+                    out[name] = at(values)
+                elif split_pairs and kpi.parts:
+                    for part, v in zip(kpi.parts, values):
+                        out[part.format(year=year)] = at(v)
+                else:
+                    out[name] = tuple(at(v) for v in values)
+        return sections
+
+    def describe(self) -> dict:
+        """{(section, output name): description}."""
+        if self._descriptions is None:
+            self._descriptions = {
+                (kpi.section, name): kpi.describe(year)
+                for kpi in self.kpis
+                for name, year in kpi.outputs()
+            }
+        return self._descriptions
+
+
+def _resolve(env, ref, prior):
+    name, _, when = ref.partition("@")
+    values = env[name]
+    if when != "prior":
+        return values
+    padded = np.concatenate([values, np.full((values.shape[0], 1), np.nan)], axis=1)
+    return padded[:, prior]
+
+
+def _select(kpis, sections):
+    if kpis is None and sections is None:
+        return list(KPIS)
+    wanted = set(kpis or ())
+    known = {k.name for k in KPIS} | {name for k in KPIS for name, _ in k.outputs()}
+    unknown = sorted(wanted - known)
+    if unknown:
+        raise ValueError(f"Unknown KPI(s): {', '.join(unknown)}")
+    bad = sorted(set(sections or ()) - set(SECTIONS))
+    if bad:
+        raise ValueError(f"Unknown KPI section(s): {', '.join(bad)}; expected one of {', '.join(SECTIONS)}")
+
+    selected = []
+    for kpi in KPIS:
+        outputs = [(name, year) for name, year in kpi.outputs() if name in wanted or kpi.name in wanted]
+        if sections is not None and kpi.section in sections:
+            selected.append(kpi)
+        elif outputs:
+            if len(outputs) < len(kpi.years):
+                # only some years of a per-year KPI were asked for
+                kpi = KPI(kpi.name, kpi.section, kpi.formula, kpi.inputs, kpi.description,
+                          [year for _, year in outputs], kpi.parts)
+            selected.append(kpi)
+    return selected
+
+
+def _uses_prior(node) -> bool:
+    return any(
+        ref.endswith("@prior") or _uses_prior(DEFINITIONS[ref.partition("@")[0]])
+        for ref in node.inputs
+    )
+
+
+@functools.lru_cache(maxsize=256)
+def _compile(kpis, sections, inputs) -> Plan:
+    selected = _select(kpis, sections)
+    steps, done, visiting = [], set(), set()
+
+    def visit(name):
+        base = name.partition("@")[0]
+        if base in done:
+            return
+        if base in visiting:
+            raise ValueError(f"KPI input {base!r} depends on itself")
+        node = DEFINITIONS.get(base)
+        if node is None:
+            raise ValueError(f"Unknown KPI input {base!r}")
+        visiting.add(base)
+        for ref in node.inputs:
+            visit(ref)
+        visiting.discard(base)
+        done.add(base)
+        steps.append(node)
+
+    for name in inputs:
+        visit(name)
+    for kpi in selected:
+        for ref in kpi.inputs:
+            visit(ref)
+        steps.append(kpi)
+
+    years = set()
+    for kpi in selected:
+        years.update(kpi.years)
+        if _uses_prior(kpi):
+            years.update(year - 1 for year in kpi.years)
+    # Line items first so every fetch can be issued before any formula runs
+    steps.sort(key=lambda s: not isinstance(s, LineItem))
+    return Plan(selected, steps, sorted(years, reverse=True))
+
+
+def compile_plan(kpis=None, sections=None, inputs=()) -> Plan:
+    """
+    Plan for the given KPI names (templates like "current_ratio_{year}" or
+    outputs like "current_ratio_2024") and/or sections; all KPIs when both
+    are None. `inputs` adds registry inputs/formulas (e.g. "revenue") to
+    evaluate without reporting them. Plans are cached.
+    """
+    if inputs and kpis is None and sections is None:
+        kpis = ()
+    return _compile(
+        None if kpis is None else tuple(sorted(kpis)),
+        None if sections is None else tuple(sorted(sections)),
+        tuple(inputs),
+    )
+
+
+# ---------- Reading values ----------
+
+def _float(value):
+    try:
+        return np.nan if value is None else float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def hit_reader(plan: Plan, hits, years=None):
+    """read() for one company from rag_lookup hits aligned with plan.lookups()."""
+    years = plan.years if years is None else years
+    by_name = {item.name: hit or {} for item, hit in zip(plan.line_items, hits)}
+    return lambda item: np.array([[_float(by_name[item.name].get(column(y))) for y in years]])
+
+
+def frame_reader(frames, years):
+    """
+    read() for one company from LineItemTables (or frames indexed by
+    line_item with fy_* columns): one for every statement, or
+    {statement_type: table}.
+    """
+    missing = np.full((1, len(years)), np.nan)
+    tables = {}
+
+    def table(source):
+        # each table is indexed once; reads are views into its values
+        if id(source) not in tables:
+            t = source if isinstance(source, LineItemTable) else LineItemTable.from_frame(source)
+            tables[id(source)] = (t, t.block(years))
+        return tables[id(source)]
+
+    def read(item):
+        source = frames.get(item.statement_type) if isinstance(frames, dict) else frames
+        if source is None:
+            return missing
+        t, values = table(source)
+        row = t.row(item.line_item)
+        if row is None:
+            return missing
+        return values[row:row + 1]
+    return read
+
+
+def cube_reader(cube):
+    """read() for every company of a kpi_engine.LineItemCube, over cube.years."""
+    return lambda item: cube.need(item.line_item)
+
+
+def _scalar(value, digits):
+    value = float(value)
+    if math.isnan(value):
+        return None
+    return round(value, digits) if digits is not None else value
+
+
+def as_dicts(plan: Plan, sections: dict, row: int = 0, digits=3, describe: bool = True) -> dict:
+    """
+    One company of Plan.report() as {section: {name: (value, description)}}
+    (or {name: value} without descriptions); NaN becomes None.
+    """
+    descriptions = plan.describe()
+    out = {}
+    for section, kpis in sections.items():
+        out[section] = {}
+        for name, values in kpis.items():
+            if isinstance(values, tuple):
+                value = tuple(_scalar(v[row], digits) for v in values)
+            else:
+                value = _scalar(values[row], digits)
+            out[section][name] = (value, descriptions[(section, name)]) if describe else value
+    return out
+
+
+def evaluate_frames(frames, kpis=None, sections=None, digits=3, describe: bool = True) -> dict:
+    """KPIs for one company's already-fetched statement tables or frames (see frame_reader)."""
+    plan = compile_plan(kpis, sections)
+    env = plan.evaluate(frame_reader(frames, plan.years))
+    return as_dicts(plan, plan.report(env), digits=digits, describe=describe)
@@ -0,0 +1,194 @@
+import threading
+import faiss
+import numpy as np
+from fiscal_years import parse_years, year_fields
+from vector_store import get_vectorstore
+
+
+def normalize(text: str) -> str:
+    """Key normalisation: 'balance_sheet' == 'Balance Sheet', case/space-insensitive."""
+    return " ".join(text.replace("_", " ").lower().split())
+
+
+def parse_chunk_years(text: str):
+    """
+    Split a 'Company | Statement | Line item | FY24 = x, FY23 = y, ...' chunk.
+    Returns (company, statement, line_item, {year: value}) or None if malformed.
+    """
+    parts = [p.strip() for p in text.split("|")]
+    if len(parts) < 4:
+        return None
+    return parts[0], parts[1], parts[2], parse_years(parts[3])
+
+
+def parse_chunk(text: str):
+    """parse_chunk_years with only the FY24/FY23 values: (company, statement, line_item, fy24, fy23)."""
+    parsed = parse_chunk_years(text)
+    if parsed is None:
+        return None
+    company, statement, line_item, years = parsed
+    return company, statement, line_item, years.get(2024), years.get(2023)
+
+
+class LineItemStore:
+    """
+    Columnar table of every chunk in the docstore, parsed once at load time.
+    Row i holds the chunk at FAISS position positions[i]; values[i] are its
+    float64 values per fiscal year (years, newest first), NaN where missing.
+
+    Chunks are also partitioned by (company, statement) so vector search can
+    be restricted to the few dozen vectors that can actually match.
+    """
+
+    def __init__(self, companies, statements, line_items, years, values, positions, index=None):
+        self.companies = companies
+        self.statements = statements
+        self.line_items = line_items
+        self.years = list(years)
+        self.values = np.asarray(values, dtype=np.float64).reshape(len(line_items), len(self.years))
+        self.positions = np.asarray(positions, dtype=np.int64)
+        self.index = index  # FAISS index the positions refer to
+
+        self._index = {}
+        partitions = {}
+        for row, key in enumerate(zip(companies, statements, line_items)):
+            key = tuple(normalize(k) for k in key)
+            # First chunk wins if a statement repeats a line item
+            self._index.setdefault(key, row)
+            partitions.setdefault(key[:2], []).append(self.positions[row])
+        self.partitions = {k: np.array(v, dtype=np.int64) for k, v in partitions.items()}
+        self._sub_indexes = {}
+        self._sub_lock = threading.Lock()
+
+    @classmethod
+    def from_vectorstore(cls, vectorstore):
+        companies, statements, line_items = [], [], []
+        row_years, positions = [], []
+        for pos, doc_id in sorted(vectorstore.index_to_docstore_id.items()):
+            doc = vectorstore.docstore.search(doc_id)
+            parsed = parse_chunk_years(getattr(doc, "page_content", ""))
+            if parsed is None:
+                continue
+            company, statement, line_item, years = parsed
+            companies.append(company)
+            statements.append(statement)
+            line_items.append(line_item)
+            row_years.append(years)
+            positions.append(pos)
+
+        years = sorted(set().union(*row_years), reverse=True)
+        column = {year: j for j, year in enumerate(years)}
+        values = np.full((len(row_years), len(years)), np.nan)
+        for row, by_year in enumerate(row_years):
+            for year, value in by_year.items():
+                values[row, column[year]] = value
+        return cls(companies, statements, line_items, years, values, positions, index=vectorstore.index)
+
+    def year_values(self, year: int):
+        """One year's column for every row; all-NaN if no chunk has that year."""
+        if year not in self.years:
+            return np.full(len(self), np.nan)
+        return self.values[:, self.years.index(year)]
+
+    @property
+    def fy_2024(self):
+        return self.year_values(2024)
+
+    @property
+    def fy_2023(self):
+        return self.year_values(2023)
+
+    def __len__(self):
+        return len(self.line_items)
+
+    def find(self, company: str, statement_type: str, line_item: str):
+        """Row number for an exact (normalised) key, or None."""
+        return self._index.get((normalize(company), normalize(statement_type), normalize(line_item)))
+
+    def lookup(self, company: str, statement_type: str, query: str):
+        """Same result shape as rag_lookup, or None on a miss."""
+        row = self.find(company, statement_type, query)
+        if row is None:
+            return None
+        return {
+            "line_item": query,
+            "matched_line_item": self.line_items[row],
+            **year_fields(dict(zip(self.years, self.values[row]))),
+        }
+
+    def _flat_sub_index(self, ids):
+        """Flat index over the vectors at `ids`, reconstructed from the main index."""
+        try:
+            vectors = self.index.reconstruct_batch(ids)
+        except RuntimeError:
+            # IVF indexes reconstruct by position only through a direct map
+            ivf = faiss.try_extract_index_ivf(self.index)
+            if ivf is None:
+                raise
+            ivf.make_direct_map()
+            vectors = self.index.reconstruct_batch(ids)
+        sub = faiss.IndexFlat(self.index.d, self.index.metric_type)
+        sub.add(vectors)
+        return sub
+
+    def _sub_index(self, key):
+        """Small flat index over one partition's vectors, built on first use."""
+        sub = self._sub_indexes.get(key)
+        if sub is None:
+            with self._sub_lock:
+                sub = self._sub_indexes.get(key)
+                if sub is None:
+                    ids = self.partitions[key]
+                    try:
+                        sub = self._flat_sub_index(ids)
+                    except RuntimeError:
+                        # Index can't hand back its vectors: restrict the global
+                        # search with an ID selector instead. IVF indexes only take
+                        # IVF search parameters; probing every list keeps the whole
+                        # partition reachable.
+                        selector = faiss.IDSelectorBatch(ids)
+                        ivf = faiss.try_extract_index_ivf(self.index)
+                        if ivf is not None:
+                            sub = faiss.SearchParametersIVF(sel=selector, nprobe=ivf.nlist)
+                        else:
+                            sub = faiss.SearchParameters(sel=selector)
+                        sub.selector = selector  # keep it alive as long as the parameters
+                    self._sub_indexes[key] = sub
+        return sub
+
+    def has_partition(self, company: str, statement_type: str) -> bool:
+        return (normalize(company), normalize(statement_type)) in self.partitions
+
+    def search_partition(self, company: str, statement_type: str, vectors, k: int):
+        """
+        Search `vectors` (float32 matrix) against one company/statement
+        partition only. Returns global FAISS positions per row (-1 padded),
+        or None if the partition doesn't exist.
+        """
+        key = (normalize(company), normalize(statement_type))
+        ids = self.partitions.get(key)
+        if ids is None:
+            return None
+        sub = self._sub_index(key)
+        if isinstance(sub, faiss.SearchParameters):
+            _, indices = self.index.search(vectors, k, params=sub)
+            return indices
+        _, local = sub.search(vectors, min(k, len(ids)))
+        return np.where(local == -1, -1, ids[local])
+
+
+_lock = threading.Lock()
+_store = None
+_source = None
+
+
+def get_line_item_store() -> LineItemStore:
+    """Table for the current shared vector store; rebuilt after a reload."""
+    global _store, _source
+    vectorstore = get_vectorstore()
+    if _source is not vectorstore:
+        with _lock:
+            if _source is not vectorstore:
+                _store = LineItemStore.from_vectorstore(vectorstore)
+                _source = vectorstore
+    return _store
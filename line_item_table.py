@@ -0,0 +1,112 @@
+import numpy as np
+from fiscal_years import DEFAULT_YEARS, column, year_columns, year_of
+
+
+class _Missing:
+    """Type of MISSING: returned for line items or years a table doesn't have."""
+
+    __slots__ = ()
+
+    def __repr__(self):
+        return "MISSING"
+
+    def __bool__(self):
+        return False
+
+
+MISSING = _Missing()
+
+
+class LineItemTable:
+    """
+    The few line items fetched for one company: a {line_item: row} dict over
+    a float64 (rows, years) array, years newest first, NaN where a year has
+    no value. Stands in for the per-fetch DataFrame on the KPI hot path;
+    to_pandas() gives the equivalent frame indexed by line_item.
+    """
+
+    __slots__ = ("line_items", "matched", "years", "values", "_rows", "_columns")
+
+    def __init__(self, line_items, years, values, matched=None):
+        self.line_items = list(line_items)
+        self.matched = list(self.line_items if matched is None else matched)
+        self.years = list(years)
+        self.values = np.asarray(values, dtype=np.float64).reshape(len(self.line_items), len(self.years))
+        self._rows = {}
+        for row, item in enumerate(self.line_items):
+            # First hit wins if a statement repeats a line item
+            self._rows.setdefault(item, row)
+        self._columns = {year: j for j, year in enumerate(self.years)}
+
+    @classmethod
+    def from_hits(cls, hits):
+        """Table of rag_lookup hits ({"line_item", "matched_line_item", "fy_2024", ...}); falsy hits are skipped."""
+        hits = [hit for hit in hits if hit]
+        years = [year_of(name) for name in year_columns({k for hit in hits for k in hit})] or list(DEFAULT_YEARS)
+        values = [[np.nan if hit.get(column(y)) is None else hit[column(y)] for y in years] for hit in hits]
+        return cls(
+            [hit["line_item"] for hit in hits],
+            years,
+            values,
+            [hit.get("matched_line_item") for hit in hits],
+        )
+
+    @classmethod
+    def from_frame(cls, df):
+        """Table of a frame indexed by line_item with fy_* columns."""
+        names = year_columns(df.columns)
+        values = [np.asarray(df[name].to_numpy(), dtype=np.float64) for name in names]
+        matched = df["matched_line_item"] if "matched_line_item" in df.columns else None
+        return cls(
+            df.index,
+            [year_of(name) for name in names],
+            np.column_stack(values) if values else np.empty((len(df), 0)),
+            matched,
+        )
+
+    def __len__(self):
+        return len(self.line_items)
+
+    def __contains__(self, line_item):
+        return line_item in self._rows
+
+    @property
+    def empty(self) -> bool:
+        return not self.line_items
+
+    def row(self, line_item):
+        """Index of line_item's row, or None."""
+        return self._rows.get(line_item)
+
+    def get(self, line_item, col, default=MISSING):
+        """Value at (line_item, "fy_YYYY"): a float (NaN for an empty cell) or `default` if either isn't in the table."""
+        row = self._rows.get(line_item)
+        j = self._columns.get(year_of(col)) if row is not None else None
+        return default if j is None else float(self.values[row, j])
+
+    def block(self, years):
+        """
+        (rows, len(years)) values for `years` in that order, NaN for years the
+        table doesn't have. A view, not a copy, when they are consecutive
+        table columns (e.g. the same years, newest first).
+        """
+        cols = [self._columns.get(year, -1) for year in years]
+        if cols and -1 not in cols and cols == list(range(cols[0], cols[0] + len(cols))):
+            return self.values[:, cols[0]:cols[-1] + 1]
+        padded = np.concatenate([self.values, np.full((len(self.values), 1), np.nan)], axis=1)
+        return padded[:, cols]
+
+    def to_pandas(self):
+        """The same data as a DataFrame indexed by line_item, as fetchers used to return."""
+        import pandas as pd
+
+        df = pd.DataFrame(
+            self.values,
+            index=pd.Index(self.line_items, name="line_item"),
+            columns=[column(year) for year in self.years],
+        )
+        df.insert(0, "matched_line_item", self.matched)
+        return df
+
+    def __repr__(self):
+        return f"LineItemTable({len(self)} line items, years={self.years})"
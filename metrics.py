@@ -0,0 +1,169 @@
+import bisect
+import contextvars
+import functools
+import inspect
+import threading
+import time
+from contextlib import contextmanager
+
+# Latency buckets in seconds
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_registry = []
+
+
+def _label_str(labelnames, values, extra=None):
+    pairs = list(zip(labelnames, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram rendered in Prometheus text format."""
+
+    def __init__(self, name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}  # label values -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(labels.get(n, "") for n in self.labelnames)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[i] += 1
+            series[-1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                running = 0
+                for bound, count in zip(self.buckets + ("+Inf",), series[:-1]):
+                    running += count
+                    labels = _label_str(self.labelnames, key, ("le", bound))
+                    lines.append(f"{self.name}_bucket{labels} {running}")
+                labels = _label_str(self.labelnames, key)
+                lines.append(f"{self.name}_sum{labels} {series[-1]}")
+                lines.append(f"{self.name}_count{labels} {running}")
+        return lines
+
+
+class Counter:
+    """
+    Monotonic labelled counter. At most `max_series` label combinations are
+    kept; further ones are folded into a single series labelled "other" so
+    user-supplied labels (e.g. company names) can't grow memory unbounded.
+    """
+
+    OVERFLOW = "other"
+
+    def __init__(self, name: str, documentation: str, labelnames=(), max_series: int = 5000):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.max_series = max_series
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with self._lock:
+            if key not in self._series and len(self._series) >= self.max_series:
+                key = (self.OVERFLOW,) * len(self.labelnames)
+            self._series[key] = self._series.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._series.items()):
+                lines.append(f"{self.name}{_label_str(self.labelnames, key)} {value}")
+        return lines
+
+
+def counter(name: str, documentation: str, labelnames=(), max_series: int = 5000) -> Counter:
+    metric = Counter(name, documentation, labelnames, max_series)
+    _registry.append(metric)
+    return metric
+
+
+def histogram(name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+    metric = Histogram(name, documentation, labelnames, buckets)
+    _registry.append(metric)
+    return metric
+
+
+def render_prometheus() -> str:
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# ---------- Stage timing ----------
+
+stage_seconds = histogram(
+    "rag_stage_duration_seconds",
+    "Wall-clock time per pipeline stage (embedding, FAISS search, KPI math, Postgres, ...).",
+    labelnames=("stage",),
+)
+
+# Per-request span sink; set by the GraphQL timing extension, None otherwise
+_spans = contextvars.ContextVar("timing_spans", default=None)
+
+
+@contextmanager
+def span(stage: str):
+    """Time a block into the stage histogram (and the current request, if collecting)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        stage_seconds.observe(elapsed, stage=stage)
+        spans = _spans.get()
+        if spans is not None:
+            spans.append((stage, elapsed))
+
+
+def timed(stage: str):
+    """Decorator form of span() for plain and async functions."""
+    def decorator(fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with span(stage):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(stage):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def start_collecting():
+    """Collect spans for the current context (request) into a fresh list."""
+    spans = []
+    _spans.set(spans)
+    return spans
+
+
+def summarize(spans) -> dict:
+    stages = {}
+    for stage, elapsed in spans:
+        entry = stages.setdefault(stage, {"count": 0, "seconds": 0.0})
+        entry["count"] += 1
+        entry["seconds"] += elapsed
+    return stages
@@ -1,39 +1,28 @@
 import os
+import threading
+import time
 from dotenv import load_dotenv
-from langchain_community.vectorstores import FAISS
-from langchain_community.chat_models import ChatOpenAI
-from langchain_openai import OpenAIEmbeddings
-from langchain.prompts import PromptTemplate
-from langchain.chains import RetrievalQA
+from direct_answer import match_question, question_key
+from metrics import counter, histogram, span, timed
+from semantic_cache import SemanticCache
+from vector_store import get_vectorstore
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
-# Step 1: Load environment and embedding model
+# Step 1: Load environment
 load_dotenv()
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
-if not OPENAI_API_KEY:
-    raise ValueError("OPENAI_API_KEY not found in .env")
-
-embedding_model = OpenAIEmbeddings(openai_api_key=OPENAI_API_KEY)
-
-# Step 2: Load vector store
-vectorstore = FAISS.load_local(
-    ".",
-    embeddings=embedding_model,
-    allow_dangerous_deserialization=True
-)
-
-# retriever = vectorstore.as_retriever(search_kwargs={"k": 3})
-retriever = vectorstore.as_retriever(
-    search_type="mmr",
-    search_kwargs={"k": 10, "fetch_k": 50}
-)
-
-# Step 3: Define prompt
-prompt_template = PromptTemplate(
-    input_variables=["context", "question"],
-    template="""
+# Steps 2-4 (vector store, prompt, LLM, RAG chain) are built on first use by
+# _current_chain(), so importing this module stays cheap and doesn't need
+# OPENAI_API_KEY until a question is actually asked.
+vectorstore = None
+retriever = None
+prompt_template = None
+llm = None
+qa_chain = None
+_chain_lock = threading.Lock()
+
+PROMPT = """
 You are a financial analyst assistant. Use the following financial data to answer the question. 
 Be concise, and if the information isn't available, say so.
 
@@ -41,20 +30,197 @@ Context: {context}
 Question: {question}
 Answer:
 """
-)
 
-# Step 4: Create RAG chain
-llm = ChatOpenAI(temperature=0, openai_api_key=OPENAI_API_KEY)
 
-qa_chain = RetrievalQA.from_chain_type(
-    llm=llm,
-    retriever=retriever,
-    chain_type_kwargs={"prompt": prompt_template}
+def _openai_key():
+    key = os.getenv("OPENAI_API_KEY")
+    if not key:
+        raise ValueError("OPENAI_API_KEY not found in .env")
+    return key
+
+
+# "hybrid" (BM25 + FAISS, see hybrid_retriever) or "mmr" (FAISS only, fetch_k=50)
+RETRIEVER = os.getenv("RETRIEVER", "hybrid")
+
+
+def _build_retriever(store):
+    if RETRIEVER == "hybrid":
+        from hybrid_retriever import HybridRetriever
+
+        return HybridRetriever.from_vectorstore(store)
+    # return store.as_retriever(search_kwargs={"k": 3})
+    return store.as_retriever(
+        search_type="mmr",
+        search_kwargs={"k": 10, "fetch_k": 50}
+    )
+
+
+def _build_prompt():
+    from langchain.prompts import PromptTemplate
+
+    return PromptTemplate(input_variables=["context", "question"], template=PROMPT)
+
+
+def _build_llm():
+    from langchain_community.chat_models import ChatOpenAI
+
+    return ChatOpenAI(temperature=0, openai_api_key=_openai_key())
+
+
+def _build_qa_chain(retriever):
+    from langchain.chains import RetrievalQA
+
+    return RetrievalQA.from_chain_type(
+        llm=llm,
+        retriever=retriever,
+        chain_type_kwargs={"prompt": prompt_template}
+    )
+
+
+# Answers to earlier (reworded) questions; cleared whenever the store reloads
+answer_cache = SemanticCache()
+
+
+def _current_chain():
+    """Build the chain on first use, and rebuild it if the shared store was reloaded."""
+    global vectorstore, retriever, prompt_template, llm, qa_chain
+    store = get_vectorstore()
+    if store is not vectorstore:
+        with _chain_lock:
+            if store is not vectorstore:
+                if prompt_template is None:
+                    prompt_template = _build_prompt()
+                if llm is None:
+                    llm = _build_llm()
+                retriever = _build_retriever(store)
+                qa_chain = _build_qa_chain(retriever)
+                vectorstore = store
+                answer_cache.clear()
+    return qa_chain
+
+
+def _question_guard(query: str):
+    """Companies, line-item words and numbers (years) a question mentions; cached answers must agree on all three."""
+    with span("question_guard"):
+        return question_key(query)
+
+
+def is_ready() -> bool:
+    return qa_chain is not None
+
+
+# Latency and LLM spend per answer path: "direct" (templated from a line
+# item, see direct_answer), "cache" (semantic answer cache) or "llm"
+ask_seconds = histogram(
+    "rag_ask_duration_seconds",
+    "askQuestion latency by answer path (direct, cache, llm).",
+    labelnames=("path",),
 )
+llm_tokens = counter(
+    "rag_ask_llm_tokens_total",
+    "LLM tokens spent answering askQuestion, by kind (prompt, completion).",
+    labelnames=("kind",),
+)
+llm_cost = counter(
+    "rag_ask_llm_cost_usd_total",
+    "Estimated OpenAI cost of askQuestion LLM calls, in USD.",
+)
+
+
+def _direct_answer(query: str):
+    """Lookup for a plain line-item question the fast path can answer, or None."""
+    with span("direct_answer"):
+        return match_question(query)
+
 
+def _run_chain(chain, query: str) -> str:
+    from langchain_community.callbacks import get_openai_callback
 
+    with span("llm_chain"), get_openai_callback() as usage:
+        answer = chain.run(query)
+    llm_tokens.inc(usage.prompt_tokens, kind="prompt")
+    llm_tokens.inc(usage.completion_tokens, kind="completion")
+    llm_cost.inc(usage.total_cost)
+    return answer
+
+
+@timed("rag_question")
 def run_rag_question(query: str) -> str:
-    return qa_chain.run(query)
+    start = time.perf_counter()
+    lookup = _direct_answer(query)
+    if lookup is not None:
+        ask_seconds.observe(time.perf_counter() - start, path="direct")
+        return lookup.answer()
+
+    chain = _current_chain()
+    with span("embedding"):
+        vector = vectorstore.embeddings.embed_query(query)
+    guard = _question_guard(query)
+    answer = answer_cache.lookup(vector, guard)
+    path = "cache"
+    if answer is None:
+        answer = _run_chain(chain, query)
+        answer_cache.add(query, vector, answer, guard)
+        path = "llm"
+    ask_seconds.observe(time.perf_counter() - start, path=path)
+    return answer
+
+
+ttft_seconds = histogram(
+    "rag_ask_time_to_first_token_seconds",
+    "Time from receiving a streamed question to its first LLM token.",
+)
+
+
+async def astream_rag_question(query: str, llm_override=None):
+    """
+    Streaming variant of run_rag_question. Yields events as dicts:
+    {"event": "sources", ...} with the retrieved chunks first, then one
+    {"event": "token", ...} per generated token, then {"event": "done", ...}
+    with timings and the answer path. Direct answers stream their source
+    chunk and the whole templated answer as a single token. `llm_override` takes any LangChain model with .astream
+    (e.g. a fake streaming model in tests).
+    """
+    start = time.perf_counter()
+    lookup = _direct_answer(query)
+    if lookup is not None:
+        store = get_vectorstore()
+        source = store.docstore.search(store.index_to_docstore_id[lookup.position])
+        yield {"event": "sources", "data": [source.page_content]}
+        yield {"event": "token", "data": lookup.answer()}
+        elapsed = time.perf_counter() - start
+        ask_seconds.observe(elapsed, path="direct")
+        yield {"event": "done", "data": {"ttft_seconds": elapsed, "total_seconds": elapsed, "path": "direct"}}
+        return
+
+    _current_chain()  # pick up a reloaded vector store
+    docs = await retriever.ainvoke(query)
+    yield {"event": "sources", "data": [d.page_content for d in docs]}
+
+    # Same prompt the "stuff" RetrievalQA chain builds
+    context = "\n\n".join(d.page_content for d in docs)
+    prompt = prompt_template.format(context=context, question=query)
+
+    first_token_at = None
+    async for chunk in (llm_override or llm).astream(prompt):
+        text = getattr(chunk, "content", chunk)
+        if not text:
+            continue
+        if first_token_at is None:
+            first_token_at = time.perf_counter()
+            ttft_seconds.observe(first_token_at - start)
+        yield {"event": "token", "data": text}
+
+    total = time.perf_counter() - start
+    ask_seconds.observe(total, path="llm")
+    yield {
+        "event": "done",
+        "data": {
+            "ttft_seconds": (first_token_at - start) if first_token_at else None,
+            "total_seconds": total,
+            "path": "llm",
+        },
+    }
 
 
 '''
@@ -0,0 +1,87 @@
+import os
+import threading
+import time
+import numpy as np
+
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", 0.95))
+SEMANTIC_CACHE_MAX = int(os.getenv("SEMANTIC_CACHE_MAX", 512))
+SEMANTIC_CACHE_TTL = float(os.getenv("SEMANTIC_CACHE_TTL", 3600))
+
+
+class SemanticCache:
+    """
+    Answers for previously asked questions, matched by cosine similarity of
+    the question embeddings. Vectors live in one preallocated float32 matrix
+    used as a ring buffer, so the oldest entry is overwritten once full.
+
+    An optional `guard` (any hashable) must also match exactly, so e.g. two
+    near-identical questions about different companies never share an answer.
+    """
+
+    def __init__(self, threshold: float = SEMANTIC_CACHE_THRESHOLD,
+                 max_entries: int = SEMANTIC_CACHE_MAX, ttl: float = SEMANTIC_CACHE_TTL):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self._matrix = None
+            self._expires = np.zeros(self.max_entries, dtype=np.float64)
+            self._entries = [None] * self.max_entries  # (question, answer, guard)
+            self._size = 0
+            self._next = 0
+
+    @staticmethod
+    def _unit(vector):
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, vector, guard=None):
+        """Stored answer for the most similar live question above threshold, or None."""
+        with self._lock:
+            if not self._size:
+                self.misses += 1
+                return None
+            scores = self._matrix[:self._size] @ self._unit(vector)
+            live = self._expires[:self._size] > time.monotonic()
+            live &= np.array([e[2] == guard for e in self._entries[:self._size]])
+            scores = np.where(live, scores, -np.inf)
+            best = int(np.argmax(scores))
+            if scores[best] < self.threshold:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return self._entries[best][1]
+
+    def add(self, question: str, vector, answer, guard=None):
+        if self.max_entries <= 0:
+            return
+        vector = self._unit(vector)
+        with self._lock:
+            if self._matrix is None:
+                self._matrix = np.zeros((self.max_entries, vector.shape[0]), dtype=np.float32)
+            slot = self._next
+            self._matrix[slot] = vector
+            self._expires[slot] = time.monotonic() + self.ttl
+            self._entries[slot] = (question, answer, guard)
+            self._next = (slot + 1) % self.max_entries
+            self._size = min(self._size + 1, self.max_entries)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / lookups) if lookups else None,
+                "size": self._size,
+                "max_entries": self.max_entries,
+                "threshold": self.threshold,
+                "ttl_seconds": self.ttl,
+            }
@@ -0,0 +1,17 @@
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+
+
+@pytest.fixture
+def synthetic_store():
+    """A 20-company synthetic index with HashEmbeddings, installed as the shared vector store."""
+    import vector_store
+    from benchmarks.synthetic import build_vectorstore
+
+    store, companies = build_vectorstore(20)
+    vector_store.set_vectorstore(store, version=f"test-{id(store)}")
+    return store, companies
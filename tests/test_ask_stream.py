@@ -0,0 +1,42 @@
+import json
+from fastapi.testclient import TestClient
+from langchain_core.documents import Document
+from langchain_core.language_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.prompts import PromptTemplate
+import graphql_server
+import rag_query
+
+
+class StubRetriever:
+    async def ainvoke(self, query):
+        return [Document(page_content="Infosys | balance sheet | Total current assets | FY24: 100")]
+
+
+def parse_sse(body: str) -> list:
+    events = []
+    for block in body.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+def test_ask_stream_sends_sources_then_tokens_then_done(monkeypatch):
+    monkeypatch.setattr(rag_query, "_direct_answer", lambda query: None)
+    monkeypatch.setattr(rag_query, "_current_chain", lambda: None)
+    monkeypatch.setattr(rag_query, "retriever", StubRetriever())
+    monkeypatch.setattr(rag_query, "prompt_template", PromptTemplate.from_template("{context}\n{question}"))
+    monkeypatch.setattr(rag_query, "llm", GenericFakeChatModel(messages=iter([AIMessage(content="It was 100 crore")])))
+
+    response = TestClient(graphql_server.app).get("/ask/stream", params={"question": "Infosys current assets?"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = parse_sse(response.text)
+    names = [name for name, _ in events]
+    assert names[0] == "sources" and names[-1] == "done"
+    assert set(names[1:-1]) == {"token"} and len(names) > 3  # streamed, not one chunk
+    assert events[0][1] == ["Infosys | balance sheet | Total current assets | FY24: 100"]
+    assert "".join(data for name, data in events if name == "token") == "It was 100 crore"
+    assert events[-1][1]["path"] == "llm"
+    assert events[-1][1]["ttft_seconds"] is not None
@@ -0,0 +1,109 @@
+import contextlib
+import psycopg2
+import pytest
+from psycopg2 import pool as pg_pool
+import db_utils
+
+
+class StubCursor:
+    rows = []  # what fetchall() returns
+    executed = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql):
+        self.executed.append(sql)
+
+    def fetchall(self):
+        return self.rows
+
+
+class StubConnection:
+    closed = 0
+
+    def cursor(self):
+        return StubCursor()
+
+    def rollback(self):
+        pass
+
+
+class StubPool:
+    """getconn/putconn/closeall, recording what was borrowed and returned."""
+
+    def __init__(self):
+        self.out = set()
+        self.returned = []
+        self.most_out = 0
+
+    def getconn(self):
+        conn = StubConnection()
+        self.out.add(conn)
+        self.most_out = max(self.most_out, len(self.out))
+        return conn
+
+    def putconn(self, conn, close=False):
+        self.out.discard(conn)
+        self.returned.append((conn, close))
+
+    def closeall(self):
+        pass
+
+
+@pytest.fixture
+def stub_pool():
+    db_utils.close_pool()
+    pool = StubPool()
+    db_utils.init_pool(maxconn=2, pool=pool)
+    yield pool
+    db_utils.close_pool()
+
+
+def test_connection_returned_on_error(stub_pool):
+    with pytest.raises(ValueError):
+        with db_utils.pooled_connection() as conn:
+            raise ValueError("query failed")
+    assert stub_pool.returned == [(conn, False)]
+    assert not stub_pool.out
+
+
+def test_broken_connection_closed(stub_pool):
+    with pytest.raises(psycopg2.OperationalError):
+        with db_utils.pooled_connection() as conn:
+            raise psycopg2.OperationalError("server closed the connection")
+    assert stub_pool.returned == [(conn, True)]
+
+
+def test_checkouts_bounded_by_maxconn(stub_pool, monkeypatch):
+    monkeypatch.setattr(db_utils, "DB_POOL_TIMEOUT", 0.05)
+    with contextlib.ExitStack() as held:
+        for _ in range(2):
+            held.enter_context(db_utils.pooled_connection())
+        with pytest.raises(pg_pool.PoolError):
+            with db_utils.pooled_connection():
+                pass
+    assert stub_pool.most_out == 2
+    assert not stub_pool.out
+
+    # Slots are released after errors too
+    for _ in range(3):
+        with pytest.raises(ValueError):
+            with db_utils.pooled_connection():
+                raise ValueError
+    with db_utils.pooled_connection():
+        pass
+
+
+def test_year_columns_read_from_current_schema(stub_pool, monkeypatch):
+    monkeypatch.setattr(db_utils, "_year_columns", None)
+    monkeypatch.setattr(StubCursor, "executed", [])
+    monkeypatch.setattr(StubCursor, "rows", [("company",), ("fy_2023",), ("fy_2024",), ("line_item",), ("fy_2022",)])
+
+    assert db_utils.financial_year_columns() == ["fy_2024", "fy_2023", "fy_2022"]
+    query = StubCursor.executed[-1]
+    assert "table_name = 'financial_statements'" in query
+    assert "table_schema = current_schema()" in query
@@ -0,0 +1,98 @@
+import numpy as np
+import pytest
+import direct_answer
+import line_item_store
+from direct_answer import match_question
+from line_item_store import LineItemStore, get_line_item_store
+
+
+def company_with(store, companies, statement_type, line_item):
+    return next(c for c in companies if store.find(c, statement_type, line_item) is not None)
+
+
+@pytest.fixture
+def tiny_store(monkeypatch):
+    """Hand-made store with repeated and cross-statement receivables rows."""
+    rows = [
+        ("Acme Corp", "Balance Sheet", "Trade receivables", (120.0, 100.0)),
+        ("Acme Corp", "Balance Sheet", "Trade receivables", (15.0, 12.0)),      # non-current, same name
+        ("Acme Corp", "Cash Flows", "(Increase)/decrease in trade receivables", (-20.0, -8.0)),
+        ("Acme Corp", "Balance Sheet", "Total Equity", (500.0, 450.0)),
+        ("Acme Corp", "Profit and Loss", "Total Equity", (500.0, 450.0)),      # same figures elsewhere
+        ("Acme Holdings", "Balance Sheet", "Total Equity", (900.0, np.nan)),
+    ]
+    store = LineItemStore(
+        companies=[r[0] for r in rows], statements=[r[1] for r in rows], line_items=[r[2] for r in rows],
+        years=[2024, 2023], values=[r[3] for r in rows], positions=range(len(rows)),
+    )
+    monkeypatch.setattr(line_item_store, "get_line_item_store", lambda: store)
+    return store
+
+
+def test_exact_line_item_answered_directly(synthetic_store):
+    _, companies = synthetic_store
+    store = get_line_item_store()
+    company = company_with(store, companies, "balance_sheet", "Total Current Assets")
+    row = store.find(company, "balance_sheet", "Total Current Assets")
+
+    lookup = match_question(f"Give me Total Current Assets for {company}")
+    assert lookup.confidence == 1.0
+    assert (lookup.company, lookup.line_item, lookup.position) == (company, "Total Current Assets", store.positions[row])
+    assert list(lookup.values) == [2024, 2023]
+    assert lookup.values[2024] == store.values[row, 0]
+    assert lookup.answer().startswith(f"Total Current Assets for {company} (Balance Sheet): FY24 = ")
+
+
+@pytest.mark.parametrize("phrase", ["in FY24", "for 2023-24", "in 2024", "FY'24"])
+def test_named_year_only(synthetic_store, phrase):
+    _, companies = synthetic_store
+    company = company_with(get_line_item_store(), companies, "balance_sheet", "Total Assets")
+    lookup = match_question(f"What were the total assets of {company} {phrase}?")
+    assert list(lookup.values) == [2024]
+    assert " in FY24 was " in lookup.answer()
+
+
+@pytest.mark.parametrize("question", [
+    "How did Total Assets of {company} change?",            # analysis word
+    "Compare Total Assets of {company} and {other}",        # two companies
+    "Give me Total Assets",                                 # no company
+    "Total Assets of {company} in FY2019",                  # year the chunk doesn't have
+    "What is {company} doing about sustainability?",         # no line item close enough
+])
+def test_questions_left_to_the_llm(synthetic_store, question):
+    _, companies = synthetic_store
+    assert match_question(question.format(company=companies[5], other=companies[6])) is None
+
+
+def test_threshold_above_one_disables(synthetic_store):
+    _, companies = synthetic_store
+    company = company_with(get_line_item_store(), companies, "balance_sheet", "Total Assets")
+    assert match_question(f"Total Assets of {company}", threshold=1.01) is None
+    assert match_question(f"Total Assets of {company}", threshold=0.8) is not None
+
+
+def test_ties_with_different_figures_are_not_answered(tiny_store):
+    # Two "Trade receivables" rows and a cash-flow movement naming the same words
+    assert match_question("Acme Corp trade receivables FY24") is None
+
+
+def test_ties_with_same_figures_are_answered(tiny_store):
+    lookup = match_question("Acme Corp total equity")
+    assert lookup.confidence == 1.0
+    assert lookup.values == {2024: 500.0, 2023: 450.0}
+
+
+def test_company_matched_by_full_name(tiny_store):
+    # Only Acme Holdings' rows are scored, not Acme Corp's
+    lookup = match_question("What is the total equity of Acme Holdings in FY24?")
+    assert (lookup.company, lookup.values) == ("Acme Holdings", {2024: 900.0})
+    assert match_question("Total equity of Acme Holdings in FY23") is None  # no FY23 figure
+
+
+def test_catalog_rebuilt_for_a_new_store(tiny_store, monkeypatch):
+    assert match_question("Acme Corp total equity") is not None
+    other = LineItemStore(["Other Co"], ["Balance Sheet"], ["Total Equity"], [2024], [[1.0]], [0])
+    monkeypatch.setattr(line_item_store, "get_line_item_store", lambda: other)
+    assert match_question("Acme Corp total equity") is None
+    assert match_question("Other Co total equity").values == {2024: 1.0}
+    assert direct_answer._source is other
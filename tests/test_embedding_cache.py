@@ -0,0 +1,81 @@
+import asyncio
+import os
+import sqlite3
+import pytest
+import embedding_cache
+from benchmarks.fakes import HashEmbeddings
+from embedding_cache import CachedEmbeddings, EmbeddingCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Wall clock the cache stamps last_used with, advanced by hand."""
+    now = [1000.0]
+    monkeypatch.setattr(embedding_cache.time, "time", lambda: now[0])
+    return now
+
+
+def last_used(path, text):
+    with sqlite3.connect(path) as conn:
+        return conn.execute("SELECT last_used FROM embeddings WHERE text = ?", (text,)).fetchone()[0]
+
+
+def test_hits_and_misses(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite3"))
+    cache.put_many("m", ["a", "b"], [[1.0, 2.0], [3.0, 4.0]])
+
+    assert cache.get_many("m", ["a", "c", "b"]) == [[1.0, 2.0], None, [3.0, 4.0]]
+    assert cache.get_many("other-model", ["a"]) == [None]
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["size"]) == (2, 2, 2)
+
+    reopened = EmbeddingCache(str(tmp_path / "cache.sqlite3"))
+    assert reopened.get_many("m", ["b"]) == [[3.0, 4.0]]
+
+
+def test_recency_bumps_are_batched(tmp_path, clock):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = EmbeddingCache(path, flush_every=3, flush_interval=3600)
+    cache.put_many("m", ["a", "b", "c"], [[1.0]] * 3)
+
+    clock[0] = 2000.0
+    cache.get_many("m", ["a", "b"])
+    assert last_used(path, "a") == 1000.0  # pending, not written on read
+    cache.get_many("m", ["c"])
+    assert last_used(path, "a") == last_used(path, "c") == 2000.0  # third bump flushes
+
+    clock[0] = 3000.0
+    cache.get_many("m", ["b"])
+    cache.flush()
+    assert last_used(path, "b") == 3000.0
+
+
+def test_evicts_least_recently_used(tmp_path, clock):
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite3"), max_entries=2)
+    cache.put_many("m", ["a"], [[1.0]])
+    clock[0] += 1
+    cache.put_many("m", ["b"], [[2.0]])
+    clock[0] += 1
+    cache.get_many("m", ["a"])  # "a" is now more recent than "b", though not yet written
+    clock[0] += 1
+    cache.put_many("m", ["c"], [[3.0]])
+
+    assert cache.get_many("m", ["a", "b", "c"]) == [[1.0], None, [3.0]]
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["size"] == 2
+
+
+def test_cached_embeddings_call_the_model_once(tmp_path):
+    model = HashEmbeddings()
+    embeddings = CachedEmbeddings(model, EmbeddingCache(str(tmp_path / "cache.sqlite3")))
+
+    first = embeddings.embed_documents(["total assets", "total assets", "net profit"])
+    assert model.calls == 1
+    assert embeddings.embed_query("net profit") == pytest.approx(first[2])
+    assert asyncio.run(embeddings.aembed_query("total assets")) == pytest.approx(first[0])
+    assert model.calls == 1
+
+
+def test_default_path_outside_package():
+    package_dir = os.path.dirname(os.path.abspath(embedding_cache.__file__))
+    assert not embedding_cache.DEFAULT_CACHE_PATH.startswith(package_dir + os.sep)
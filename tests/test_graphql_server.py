@@ -0,0 +1,102 @@
+import asyncio
+import pytest
+from fastapi.testclient import TestClient
+import graphql_server
+import kpi_fetch_doc_items
+import result_cache
+import vector_store
+from result_cache import TTLCache
+
+
+def test_cache_stats_without_openai_key(tmp_path, monkeypatch):
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    monkeypatch.setenv("EMBEDDING_CACHE_PATH", str(tmp_path / "embeddings.sqlite3"))
+    monkeypatch.setattr(vector_store, "_embedding_cache", None)
+
+    response = TestClient(graphql_server.app).get("/cache/stats")
+
+    assert response.status_code == 200
+    assert response.json()["embeddings"]["size"] == 0
+    assert set(response.json()) == {"company_metrics", "answers", "embeddings"}
+
+
+@pytest.fixture
+def fetches(synthetic_store, monkeypatch):
+    """Fresh metrics cache; counts afetch_plan calls (one per section computed)."""
+    monkeypatch.setattr(result_cache, "metrics_cache", TTLCache())
+    calls = []
+    afetch_plan = kpi_fetch_doc_items.afetch_plan
+
+    async def counting(company, plan, loader=None):
+        calls.append(company)
+        await asyncio.sleep(0.01)  # let concurrent requests pile up behind the first
+        return await afetch_plan(company, plan, loader)
+
+    monkeypatch.setattr(kpi_fetch_doc_items, "afetch_plan", counting)
+    return calls
+
+
+def test_concurrent_cold_requests_compute_once(synthetic_store, fetches):
+    company = synthetic_store[1][0]
+
+    async def serve(n):
+        return await asyncio.gather(*[graphql_server.compute_section(company, "balance_sheet") for _ in range(n)])
+
+    results = asyncio.run(serve(20))
+    assert len(fetches) == 1
+    assert all(r == results[0] for r in results)
+    assert not graphql_server._in_flight
+
+    asyncio.run(serve(3))  # warm: straight from the cache
+    assert len(fetches) == 1
+    assert result_cache.metrics_cache.stats()["size"] == 1
+
+
+def test_failed_computation_reaches_every_waiter(synthetic_store, fetches):
+    attempts = []
+
+    async def compute():
+        attempts.append(1)
+        await asyncio.sleep(0.01)
+        raise RuntimeError("db down")
+
+    async def serve():
+        return await asyncio.gather(
+            *[graphql_server._cached("Acme", "pnl", compute) for _ in range(3)], return_exceptions=True,
+        )
+
+    results = asyncio.run(serve())
+    assert [str(r) for r in results] == ["db down"] * 3
+    assert len(attempts) == 1
+    assert not graphql_server._in_flight
+    asyncio.run(serve())  # nothing cached: the next request tries again
+    assert len(attempts) == 2
+
+
+def test_missing_kpis_counted_per_served_section(synthetic_store, fetches):
+    company = "Unlisted Co"  # no chunks: every KPI is missing
+
+    async def serve():
+        return await graphql_server.compute_section(company, "balance_sheet")
+
+    kpis = asyncio.run(serve())
+    asyncio.run(serve())  # cached, still counted
+    assert len(fetches) == 1
+
+    evaluations = graphql_server.kpi_section_evaluations._series
+    missing = graphql_server.kpi_missing._series
+    assert evaluations[(company, "balance_sheet")] == 2
+    assert kpis and all(missing[(company, "balance_sheet", name)] == 2 for name in kpis)
+
+
+def test_company_metrics_cold_and_cached_agree(synthetic_store, fetches):
+    query = {"query": '{ companyMetrics(company: "%s") { balanceSheet { name value status } } }' % synthetic_store[1][2]}
+    client = TestClient(graphql_server.app)
+
+    cold = client.post("/graphql", json=query).json()
+    cached = client.post("/graphql", json=query).json()
+
+    assert "errors" not in cold
+    assert cold == cached
+    assert len(fetches) == 1
+    assert result_cache.metrics_cache.stats()["hits"] == 1
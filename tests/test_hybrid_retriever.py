@@ -0,0 +1,60 @@
+import asyncio
+import pytest
+from hybrid_retriever import BM25Index, HybridRetriever, reciprocal_rank_fusion, tokenize
+
+CORPUS = [
+    "Acme Corp | Balance Sheet | Total Assets | FY24 = 10, FY23 = 9",
+    "Acme Corp | Balance Sheet | Total Current Assets | FY24 = 4, FY23 = 3",
+    "Beta Ltd | Balance Sheet | Total Assets | FY24 = 20, FY23 = 18",
+    "Beta Ltd | Profit and Loss | Revenue from operations | FY24 = 50, FY23 = 45",
+]
+
+
+def test_tokenize_drops_figures_and_years():
+    assert tokenize("Acme Corp | Total Assets | FY24 = 10.5, FY2023 = 9") == ["acme", "corp", "total", "assets"]
+    assert tokenize("Profit & Loss") == ["profit", "loss"]
+
+
+def test_bm25_ranks_rarer_and_more_matching_terms_higher():
+    bm25 = BM25Index(CORPUS)
+    assert bm25.search("Beta revenue", 4)[0] == 3
+    # "current" appears once; "total assets" everywhere on the balance sheet
+    assert bm25.search("total current assets", 4)[0] == 1
+    assert bm25.search("acme total assets", 2) == [0, 1]
+    # Only documents sharing a term are returned, however large k is
+    assert sorted(bm25.search("revenue", 10)) == [3]
+    assert bm25.search("dividends", 3) == []
+    assert bm25.search("acme", 0) == []
+
+
+def test_bm25_shorter_document_wins_a_tie():
+    bm25 = BM25Index(["assets", "assets and other words too"])
+    assert bm25.search("assets", 2) == [0, 1]
+
+
+def test_reciprocal_rank_fusion_order():
+    fused = reciprocal_rank_fusion([[1, 2, 3], [3, 1, 4]], k=60)
+    # 1: 1/61 + 1/62, 3: 1/63 + 1/61, 2: 1/62, 4: 1/63
+    assert fused == [1, 3, 2, 4]
+    assert reciprocal_rank_fusion([[7, 8], []]) == [7, 8]
+    # A doc both rankers found beats one ranked first by only one of them
+    assert reciprocal_rank_fusion([[5, 6], [6, 9]], k=1)[0] == 6
+
+
+def test_retriever_finds_the_asked_chunk(synthetic_store):
+    vectorstore, companies = synthetic_store
+    retriever = HybridRetriever.from_vectorstore(vectorstore, k=3, fetch_k=10)
+    question = f"What is the Revenue from operations of {companies[9]}?"
+
+    docs = retriever.invoke(question)
+    assert len(docs) == 3
+    company, _, line_item, _ = docs[0].page_content.split(" | ")
+    assert company == companies[9] and line_item.startswith("Revenue from operations")
+    assert [d.page_content for d in asyncio.run(retriever.ainvoke(question))] == [d.page_content for d in docs]
+
+
+@pytest.mark.parametrize("k", [1, 5])
+def test_retriever_returns_k_docs(synthetic_store, k):
+    vectorstore, companies = synthetic_store
+    retriever = HybridRetriever.from_vectorstore(vectorstore, k=k)
+    assert len(retriever.invoke(f"{companies[0]} total assets")) == k
@@ -0,0 +1,211 @@
+import math
+import numpy as np
+import pandas as pd
+import pytest
+from get_kpi_on_doc_type import balance_sheet_kpis, cashflow_kpis, cross_statement_kpis, profit_and_loss_kpis
+from kpi_registry import as_dicts, compile_plan, evaluate_frames, frame_reader
+
+
+# ---------- The hand-written scalar KPIs the registry replaced, as the reference ----------
+
+def _need(df, key, col):
+    return float(df.at[key, col])  # KeyError if the line item is missing
+
+
+def _opt(df, key, col, default=0.0):
+    try:
+        val = df.at[key, col]
+        return default if val is None else float(val)
+    except KeyError:
+        return default
+
+
+def _fmt(val):
+    return None if val is None else round(val, 3)
+
+
+def legacy_balance_sheet(df):
+    out = {}
+    for y in (2024, 2023):
+        col = f"fy_{y}"
+        ca, cl = _need(df, "Total Current Assets", col), _need(df, "Total Current Liabilities", col)
+        inv = _opt(df, "Inventories", col, 0.0)
+        tl, te, ta = _need(df, "Total Liabilities", col), _need(df, "Total Equity", col), _need(df, "Total Assets", col)
+        out[f"current_ratio_{y}"] = _fmt(ca / cl if cl else None)
+        out[f"quick_ratio_{y}"] = _fmt((ca - inv) / cl if cl else None)
+        out[f"debt_to_equity_{y}"] = _fmt(tl / te if te else None)
+        out[f"assets_vs_equity_liab_{y}"] = (_fmt(ta), _fmt(te + tl))
+    return out
+
+
+def _base(pl, col):
+    rev = _opt(pl, "Revenue from operations", col, None)
+    return rev if rev is not None else _opt(pl, "Total income", col, None)
+
+
+def legacy_pnl(df):
+    _need(df, "Total expenses", "fy_2024")  # read (and required) though no KPI used it
+    base = {y: _base(df, f"fy_{y}") for y in (2024, 2023)}
+    pat = {y: _need(df, "Profit for the year", f"fy_{y}") for y in (2024, 2023)}
+    out = {}
+    for y in (2024, 2023):
+        col = f"fy_{y}"
+        pbt = _need(df, "Profit before tax", col)
+        out[f"net_profit_margin_{y}"] = _fmt(pat[y] / base[y] if base[y] else None)
+        out[f"pbt_margin_{y}"] = _fmt(pbt / base[y] if base[y] else None)
+        out[f"finance_cost_{y}"] = _fmt(_opt(df, "Finance costs", col, 0.0))
+        out[f"depreciation_{y}"] = _fmt(_opt(df, "Depreciation and amortization", col, 0.0))
+    out["revenue_yoy_growth"] = _fmt((base[2024] - base[2023]) / base[2023] if base[2023] else None)
+    out["net_profit_yoy_growth"] = _fmt((pat[2024] - pat[2023]) / pat[2023] if pat[2023] else None)
+    return out
+
+
+def legacy_cashflow(df):
+    out = {}
+    for y in (2024, 2023):
+        col = f"fy_{y}"
+        cfo = _need(df, "Net cash from operating activities", col)
+        out[f"cfo_{y}"] = _fmt(cfo)
+        out[f"cfi_{y}"] = _fmt(_need(df, "Net cash from investing activities", col))
+        out[f"cff_{y}"] = _fmt(_need(df, "Net cash from financing activities", col))
+        out[f"free_cash_flow_{y}"] = _fmt(cfo + _opt(df, "Purchase of property, plant and equipment", col, 0.0))
+        out[f"dividends_{y}"] = _fmt(_opt(df, "Dividends paid", col, 0.0))
+    cfo, cfi, cff = (_need(df, f"Net cash from {a} activities", "fy_2024") for a in ("operating", "investing", "financing"))
+    denom = abs(cfo) + abs(cfi) + abs(cff)
+    out["cfo_mix_2024"] = _fmt(cfo / denom if denom else None)
+    out["cfi_mix_2024"] = _fmt(cfi / denom if denom else None)
+    out["cff_mix_2024"] = _fmt(cff / denom if denom else None)
+    return out
+
+
+def legacy_cross(bs, pl, cf):
+    te, ta = _need(bs, "Total Equity", "fy_2024"), _need(bs, "Total Assets", "fy_2024")
+    rec24, rec23 = _opt(bs, "Trade receivables", "fy_2024", None), _opt(bs, "Trade receivables", "fy_2023", None)
+    base24, base23 = _base(pl, "fy_2024"), _base(pl, "fy_2023")
+    pat = _need(pl, "Profit for the year", "fy_2024")
+    cfo = _need(cf, "Net cash from operating activities", "fy_2024")
+    return {
+        "roe_2024": _fmt(pat / te if te else None),
+        "roa_2024": _fmt(pat / ta if ta else None),
+        "cash_conversion_2024": _fmt(cfo / pat if pat else None),
+        "receivables_as_pct_of_revenue_2024": _fmt(rec24 / base24 if (rec24 is not None and base24) else None),
+        "receivables_yoy_growth": _fmt((rec24 - rec23) / rec23 if (rec24 is not None and rec23 not in (None, 0)) else None),
+        "revenue_yoy_growth": _fmt((base24 - base23) / base23 if base23 else None),
+    }
+
+
+def legacy(bs, pl, cf):
+    return {
+        "balance_sheet": legacy_balance_sheet(bs),
+        "pnl": legacy_pnl(pl),
+        "cashflow": legacy_cashflow(cf),
+        "cross_statement": legacy_cross(bs, pl, cf),
+    }
+
+
+# ---------- Fixed statements ----------
+
+def frame(items: dict) -> pd.DataFrame:
+    """{line_item: (fy_2024, fy_2023)} as a fetcher frame."""
+    df = pd.DataFrame(
+        [(item, item, fy24, fy23) for item, (fy24, fy23) in items.items()],
+        columns=["line_item", "matched_line_item", "fy_2024", "fy_2023"],
+    )
+    return df.set_index("line_item")
+
+
+BS = {
+    "Total Current Assets": (5400.5, 4987.25), "Total Current Liabilities": (3120.0, 2999.9),
+    "Inventories": (812.3, 790.0), "Total Liabilities": (9100.0, 8700.4), "Total Equity": (7300.75, 6800.0),
+    "Total Assets": (16400.75, 15500.4), "Trade receivables": (1450.0, 1322.6),
+}
+PL = {
+    "Revenue from operations": (21000.0, 18750.5), "Total income": (21900.0, 19300.0),
+    "Total expenses": (18200.0, 16400.0), "Profit before tax": (3700.0, 2900.0),
+    "Profit for the year": (2760.4, 2175.0), "Finance costs": (310.2, 280.0),
+    "Depreciation and amortization": (640.0, 610.5),
+}
+CF = {
+    "Net cash from operating activities": (3300.0, 2800.0), "Net cash from investing activities": (-1900.0, -1500.0),
+    "Net cash from financing activities": (-1100.0, -900.0),
+    "Purchase of property, plant and equipment": (-1200.0, -1000.0), "Dividends paid": (-600.0, -550.0),
+}
+
+
+def kpis(bs, pl, cf):
+    """evaluate_frames without descriptions."""
+    return evaluate_frames({"balance_sheet": bs, "profit_and_loss": pl, "cash_flows": cf}, describe=False)
+
+
+def replaced(items, changes: dict):
+    """Copy of `items` with some values changed; None removes the line item."""
+    out = {**items, **changes}
+    return {item: values for item, values in out.items() if values is not None}
+
+
+@pytest.mark.parametrize("bs, pl, cf", [
+    (BS, PL, CF),
+    # zero denominators: NaN / None, never inf
+    (replaced(BS, {"Total Current Liabilities": (0.0, 0.0), "Total Equity": (0.0, 1.0)}),
+     replaced(PL, {"Revenue from operations": (0.0, 0.0), "Profit for the year": (100.0, 0.0)}),
+     replaced(CF, {"Net cash from operating activities": (0.0, 0.0),
+                     "Net cash from investing activities": (0.0, 0.0),
+                     "Net cash from financing activities": (0.0, 0.0)})),
+    # missing optional items: defaults, the Total income fallback, None receivables
+    (replaced(BS, {"Inventories": None, "Trade receivables": None}),
+     replaced(PL, {"Revenue from operations": None, "Finance costs": None}),
+     replaced(CF, {"Purchase of property, plant and equipment": None, "Dividends paid": None})),
+    # receivables falling to zero the year before
+    (replaced(BS, {"Trade receivables": (500.0, 0.0)}), PL, CF),
+])
+def test_matches_scalar_formulas(bs, pl, cf):
+    bs, pl, cf = frame(bs), frame(pl), frame(cf)
+    assert kpis(bs, pl, cf) == legacy(bs, pl, cf)
+    # The per-statement wrappers give the same values, with descriptions
+    wrappers = {
+        "balance_sheet": balance_sheet_kpis(bs), "pnl": profit_and_loss_kpis(pl),
+        "cashflow": cashflow_kpis(cf), "cross_statement": cross_statement_kpis(bs, pl, cf),
+    }
+    assert {s: {k: v for k, (v, _) in d.items()} for s, d in wrappers.items()} == legacy(bs, pl, cf)
+
+
+def test_descriptions_unchanged():
+    described = evaluate_frames({"balance_sheet": frame(BS), "profit_and_loss": frame(PL), "cash_flows": frame(CF)})
+    assert described["balance_sheet"]["current_ratio_2023"][1] == \
+        "Liquidity ratio: current assets ÷ current liabilities (FY2023)."
+    assert described["cashflow"]["cfo_mix_2024"][1] == "Share of operating cash in total cash flow mix (FY2024)."
+
+
+def test_total_expenses_no_longer_needed():
+    assert "Total expenses" not in [item.line_item for item in compile_plan().line_items]
+    without = replaced(PL, {"Total expenses": None})
+    with pytest.raises(KeyError):
+        legacy_pnl(frame(without))
+    assert kpis(frame(BS), frame(without), frame(CF)) == legacy(frame(BS), frame(PL), frame(CF))
+
+
+def test_missing_required_input_only_blanks_its_kpis():
+    # The old functions raised KeyError for the whole section
+    got = kpis(frame(replaced(BS, {"Total Current Liabilities": None})), frame(PL), frame(CF))
+    expected = legacy(frame(BS), frame(PL), frame(CF))
+    for name in ("current_ratio_2024", "current_ratio_2023", "quick_ratio_2024", "quick_ratio_2023"):
+        assert got["balance_sheet"].pop(name) is None
+        expected["balance_sheet"].pop(name)
+    assert got == expected
+
+
+def test_plan_evaluates_companies_as_rows():
+    companies = [
+        (frame(BS), frame(PL), frame(CF)),
+        (frame(replaced(BS, {"Total Equity": (0.0, 0.0)})), frame(replaced(PL, {"Revenue from operations": None})), frame(CF)),
+    ]
+    plan = compile_plan()
+    readers = [frame_reader({"balance_sheet": bs, "profit_and_loss": pl, "cash_flows": cf}, plan.years)
+               for bs, pl, cf in companies]
+    env = plan.evaluate(lambda item: np.vstack([read(item) for read in readers]))
+
+    assert env["current_ratio"].shape == (2, len(plan.years))
+    assert math.isnan(env["debt_to_equity"][1, 0])
+    sections = plan.report(env)
+    for row, (bs, pl, cf) in enumerate(companies):
+        assert as_dicts(plan, sections, row=row, describe=False) == legacy(bs, pl, cf)
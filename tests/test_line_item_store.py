@@ -0,0 +1,98 @@
+import asyncio
+import faiss
+import numpy as np
+import pytest
+from benchmarks.synthetic import STATEMENTS
+from KPIs_RAF_FSI.kpi_rag_retrieval import arag_lookup_batch, rag_lookup, rag_lookup_batch
+from line_item_store import LineItemStore, get_line_item_store, normalize
+
+
+def partition_rows(store, company, statement_type):
+    key = (normalize(company), normalize(statement_type))
+    return [row for row in range(len(store)) if (normalize(store.companies[row]), normalize(store.statements[row])) == key]
+
+
+def query_vectors(vectorstore, texts):
+    return np.array(vectorstore.embeddings.embed_documents(texts), dtype=np.float32)
+
+
+def test_partitions_cover_each_company_statement(synthetic_store):
+    vectorstore, companies = synthetic_store
+    store = get_line_item_store()
+
+    assert len(store.partitions) == len(companies) * len(STATEMENTS)
+    for (company, statement), positions in store.partitions.items():
+        rows = partition_rows(store, company, statement)
+        assert sorted(positions) == sorted(store.positions[rows])
+
+
+def test_partition_search_is_exact_and_lazy(synthetic_store):
+    vectorstore, companies = synthetic_store
+    store = LineItemStore.from_vectorstore(vectorstore)
+    company = companies[4]
+    vectors = query_vectors(vectorstore, [f"{company} Balance Sheet Total Assets", "current assets in total"])
+
+    assert store.search_partition("Nobody Ltd", "balance_sheet", vectors, 3) is None
+    assert not store._sub_indexes
+    found = store.search_partition(company, "balance_sheet", vectors, 3)
+    assert list(store._sub_indexes) == [(normalize(company), "balance sheet")]
+
+    # Same top 3 as brute force over the partition's vectors
+    ids = store.partitions[(normalize(company), "balance sheet")]
+    partition = vectorstore.index.reconstruct_batch(ids)
+    distances = ((vectors[:, None, :] - partition[None, :, :]) ** 2).sum(axis=2)
+    assert found.tolist() == ids[np.argsort(distances, axis=1)[:, :3]].tolist()
+
+
+@pytest.mark.parametrize("reconstructable", [True, False])
+def test_partition_search_on_ivf_index(synthetic_store, monkeypatch, reconstructable):
+    vectorstore, companies = synthetic_store
+    flat = vectorstore.index
+    ivf = faiss.IndexIVFFlat(faiss.IndexFlatL2(flat.d), flat.d, 8)
+    vectors = flat.reconstruct_n(0, flat.ntotal)
+    ivf.train(vectors)
+    ivf.add(vectors)
+    ivf.nprobe = 1
+    store = LineItemStore.from_vectorstore(vectorstore)
+    store.index = ivf
+    if not reconstructable:
+        def no_vectors(ids):
+            raise RuntimeError("index can't reconstruct")
+        monkeypatch.setattr(store, "_flat_sub_index", no_vectors)  # forces the ID-selector fallback
+
+    query = query_vectors(vectorstore, [f"{companies[2]} Cash Flows Dividends paid"])
+    found = store.search_partition(companies[2], "cash_flows", query, 3)
+    expected = LineItemStore.from_vectorstore(vectorstore).search_partition(companies[2], "cash_flows", query, 3)
+    assert found.tolist() == expected.tolist()
+
+
+def test_batch_matches_single_lookups(synthetic_store):
+    vectorstore, companies = synthetic_store
+    lookups = [
+        (companies[0], "balance_sheet", "Total Assets"),               # exact: structured store
+        (companies[0], "balance_sheet", "current assets in total"),    # paraphrase: vector search
+        (companies[1], "profit_and_loss", "Profit for the period"),
+        (companies[1], "profit_and_loss", "net profit of the year"),
+        (companies[0], "balance_sheet", "current assets in total"),    # repeated
+        (companies[3], "cash_flows", "dividend payments"),
+        ("Nobody Ltd", "balance_sheet", "Total Assets"),               # unknown partition
+        (companies[3], "no_such_statement", "Total Assets"),
+    ]
+    single = [rag_lookup(*lookup) for lookup in lookups]
+
+    assert rag_lookup_batch(lookups) == single
+    assert asyncio.run(arag_lookup_batch(lookups)) == single
+    assert single[0]["matched_line_item"] == "Total Assets"
+    assert single[-2] is None and single[-1] is None
+    # Vector hits come from the asked company's own statement
+    store = get_line_item_store()
+    for (company, statement_type, _), hit in zip(lookups[:6], single):
+        items = {store.line_items[row] for row in partition_rows(store, company, statement_type)}
+        assert hit["matched_line_item"] in items
+
+
+def test_unknown_partitions_skip_embedding(synthetic_store):
+    vectorstore, _ = synthetic_store
+    calls = vectorstore.embeddings.calls
+    assert rag_lookup_batch([("Nobody Ltd", "balance_sheet", "anything at all")]) == [None]
+    assert vectorstore.embeddings.calls == calls
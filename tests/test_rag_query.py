@@ -0,0 +1,25 @@
+from langchain_core.language_models.fake import FakeListLLM
+import rag_query
+from semantic_cache import SemanticCache
+
+
+def test_cached_answers_keep_line_items_apart(synthetic_store, monkeypatch):
+    _, companies = synthetic_store
+    monkeypatch.setattr(rag_query, "vectorstore", None)  # rebuild the chain around the fake LLM
+    monkeypatch.setattr(rag_query, "llm", FakeListLLM(responses=["first", "second", "third"]))
+    # Every question is similar enough to every other; only the guard tells them apart
+    monkeypatch.setattr(rag_query, "answer_cache", SemanticCache(threshold=-1.0))
+    company = companies[0]
+
+    assert rag_query.run_rag_question(f"{company} total assets change") == "first"
+    assert rag_query.run_rag_question(f"{company} total current assets change") == "second"
+    assert rag_query.run_rag_question(f"How did {company} total assets change?") == "first"
+    assert rag_query.run_rag_question(f"{companies[1]} total assets change") == "third"
+
+
+def test_question_guard(synthetic_store):
+    _, companies = synthetic_store
+    companies_named, items, numbers = rag_query._question_guard(f"What were {companies[3]} Total Assets in FY24?")
+    assert companies_named == {companies[3].lower()}
+    assert items == {"total", "asset"}
+    assert "24" in numbers
@@ -0,0 +1,149 @@
+import hashlib
+import os
+import threading
+from dotenv import load_dotenv
+
+# langchain/openai imports are deferred to first use: they dominate cold-start time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+load_dotenv(dotenv_path=os.path.join(BASE_DIR, ".env"))
+
+# Directory holding index.faiss / index.pkl (defaults to the repo root)
+INDEX_DIR = os.getenv("FAISS_INDEX_DIR", BASE_DIR)
+
+_lock = threading.Lock()
+_cache_lock = threading.Lock()
+_embeddings = None
+_embedding_cache = None
+_vectorstore = None
+_index_version = None
+
+
+def get_embedding_cache():
+    """
+    Process-wide on-disk query-embedding cache, opened on first use, or None
+    when EMBEDDING_CACHE_PATH is set to "". Needs no OpenAI key.
+    """
+    global _embedding_cache
+    if _embedding_cache is None:
+        from embedding_cache import DEFAULT_CACHE_PATH, DEFAULT_MAX_ENTRIES, EmbeddingCache
+
+        cache_path = os.getenv("EMBEDDING_CACHE_PATH", DEFAULT_CACHE_PATH)
+        if not cache_path:
+            return None
+        with _cache_lock:
+            if _embedding_cache is None:
+                max_entries = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES))
+                _embedding_cache = EmbeddingCache(cache_path, max_entries)
+    return _embedding_cache
+
+
+def _build_embeddings():
+    from langchain_openai import OpenAIEmbeddings
+    from embedding_cache import CachedEmbeddings
+
+    openai_key = os.getenv("OPENAI_API_KEY")
+    if not openai_key:
+        raise ValueError("OPENAI_API_KEY not found in .env")
+    embeddings = OpenAIEmbeddings(openai_api_key=openai_key)
+    cache = get_embedding_cache()
+    return embeddings if cache is None else CachedEmbeddings(embeddings, cache)
+
+
+def _load(index_dir: str, embeddings, writable: bool = False):
+    """
+    Prefer the compact mmap'd format (see compact_index.py) when present;
+    `writable` forces the pickled index.pkl, which index builders modify.
+    """
+    import compact_index
+    from langchain_community.vectorstores import FAISS
+
+    if not writable and compact_index.exists(index_dir):
+        return compact_index.load(index_dir, embeddings)
+    return FAISS.load_local(
+        index_dir,
+        embeddings,
+        allow_dangerous_deserialization=True,
+    )
+
+
+def _content_hash(index_dir: str, names=("index.faiss", "index.pkl")) -> str:
+    """sha256 over the index files, so a rebuilt index gets a new version."""
+    digest = hashlib.sha256()
+    for name in names:
+        with open(os.path.join(index_dir, name), "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    return digest.hexdigest()[:16]
+
+
+def _version(index_dir: str) -> str:
+    # The compact format records its version at conversion, so startup hashes nothing
+    import compact_index
+
+    if compact_index.exists(index_dir):
+        return compact_index.read_meta(index_dir)["version"]
+    return _content_hash(index_dir)
+
+
+def get_embeddings():
+    """Process-wide embeddings client, created on first use."""
+    global _embeddings
+    if _embeddings is None:
+        with _lock:
+            if _embeddings is None:
+                _embeddings = _build_embeddings()
+    return _embeddings
+
+
+def get_vectorstore():
+    """Process-wide FAISS store; loaded once and shared by every request."""
+    global _vectorstore, _index_version
+    if _vectorstore is None:
+        embeddings = get_embeddings()
+        with _lock:
+            if _vectorstore is None:
+                _index_version = _version(INDEX_DIR)
+                _vectorstore = _load(INDEX_DIR, embeddings)
+    return _vectorstore
+
+
+def is_loaded() -> bool:
+    return _vectorstore is not None
+
+
+def index_version() -> str:
+    """Content hash of the currently loaded index (loads it if needed)."""
+    get_vectorstore()
+    return _index_version
+
+
+def set_vectorstore(store, version: str = "custom"):
+    """
+    Swap in an already-built store and its embeddings (e.g. a synthetic index
+    with local fake embeddings for benchmarks). Caches keyed on the index
+    version or store identity rebuild as they would after a reload.
+    """
+    global _embeddings, _vectorstore, _index_version
+    with _lock:
+        _embeddings = store.embeddings
+        _vectorstore = store
+        _index_version = version
+    return store
+
+
+def reload_vectorstore(index_dir: str = None):
+    """
+    Re-read the index from disk and swap it in atomically.
+    In-flight lookups keep using the store they already hold.
+    """
+    global _vectorstore, _index_version
+    embeddings = get_embeddings()
+    index_dir = index_dir or INDEX_DIR
+    version = _version(index_dir)
+    store = _load(index_dir, embeddings)
+    with _lock:
+        _vectorstore = store
+        _index_version = version
+    return store